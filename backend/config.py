@@ -1,42 +1,85 @@
 """
 Configuration Management
 Loads settings from environment variables
+
+Settings are read lazily on first access and cached, so importing this
+module does no .env parsing or disk I/O. Existing module-level names
+(e.g. `from backend.config import DATA_DIR`) are resolved via __getattr__.
 """
 
 import os
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
 
-# Data Configuration
-DATA_DIR = os.getenv('DATA_DIR', '.data')
-DATA_DIR_PATH = Path(DATA_DIR)
-DATA_DIR_PATH.mkdir(parents=True, exist_ok=True)
+# Setting name -> (default, type)
+_SETTINGS: Dict[str, Tuple[Any, Callable[[str], Any]]] = {
+    # Data Configuration
+    'DATA_DIR': ('.data', str),
+
+    # API Configuration
+    'API_HOST': ('0.0.0.0', str),
+    'API_PORT': (8000, int),
+
+    # Cache Durations (in seconds)
+    'PORT_TRAFFIC_CACHE_DURATION': (300, int),
+    'WEATHER_CACHE_DURATION': (600, int),
+    'NEWS_CACHE_DURATION': (900, int),
+
+    # ML Model Weights
+    'RISK_WEATHER_WEIGHT': (0.35, float),
+    'RISK_SENTIMENT_WEIGHT': (0.30, float),
+    'RISK_CONGESTION_WEIGHT': (0.25, float),
+    'RISK_HISTORICAL_WEIGHT': (0.10, float),
+
+    # Alert Thresholds
+    'HIGH_RISK_THRESHOLD': (0.7, float),
+    'MEDIUM_RISK_THRESHOLD': (0.4, float),
+
+    # External API Keys (for future integration)
+    'MARINETRAFFIC_API_KEY': ('', str),
+    'NOAA_API_KEY': ('', str),
+    'NEWSAPI_KEY': ('', str),
+    'OPENAI_API_KEY': ('', str),
+}
+
+
+@lru_cache(maxsize=None)
+def _dotenv_loaded() -> bool:
+    """Load environment variables from .env file (once)"""
+    load_dotenv()
+    return True
+
+
+@lru_cache(maxsize=None)
+def get_setting(name: str) -> Any:
+    """
+    Get a configuration value from the environment
 
-# API Configuration
-API_HOST = os.getenv('API_HOST', '0.0.0.0')
-API_PORT = int(os.getenv('API_PORT', 8000))
+    Args:
+        name: Setting name (same as the environment variable)
 
-# Cache Durations (in seconds)
-PORT_TRAFFIC_CACHE_DURATION = int(os.getenv('PORT_TRAFFIC_CACHE_DURATION', 300))
-WEATHER_CACHE_DURATION = int(os.getenv('WEATHER_CACHE_DURATION', 600))
-NEWS_CACHE_DURATION = int(os.getenv('NEWS_CACHE_DURATION', 900))
+    Returns:
+        Setting value converted to its configured type
+    """
+    default, cast = _SETTINGS[name]
+    _dotenv_loaded()
+    return cast(os.getenv(name, default))
 
-# ML Model Weights
-RISK_WEATHER_WEIGHT = float(os.getenv('RISK_WEATHER_WEIGHT', 0.35))
-RISK_SENTIMENT_WEIGHT = float(os.getenv('RISK_SENTIMENT_WEIGHT', 0.30))
-RISK_CONGESTION_WEIGHT = float(os.getenv('RISK_CONGESTION_WEIGHT', 0.25))
-RISK_HISTORICAL_WEIGHT = float(os.getenv('RISK_HISTORICAL_WEIGHT', 0.10))
 
-# Alert Thresholds
-HIGH_RISK_THRESHOLD = float(os.getenv('HIGH_RISK_THRESHOLD', 0.7))
-MEDIUM_RISK_THRESHOLD = float(os.getenv('MEDIUM_RISK_THRESHOLD', 0.4))
+@lru_cache(maxsize=None)
+def get_data_dir() -> Path:
+    """Get the data directory, creating it on first access"""
+    data_dir = Path(get_setting('DATA_DIR'))
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
 
-# External API Keys (for future integration)
-MARINETRAFFIC_API_KEY = os.getenv('MARINETRAFFIC_API_KEY', '')
-NOAA_API_KEY = os.getenv('NOAA_API_KEY', '')
-NEWSAPI_KEY = os.getenv('NEWSAPI_KEY', '')
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 
+def __getattr__(name: str) -> Any:
+    if name == 'DATA_DIR_PATH':
+        return get_data_dir()
+    if name in _SETTINGS:
+        return get_setting(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
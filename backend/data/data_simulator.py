@@ -3,13 +3,29 @@ Data Simulator for Real-time Supply Chain Data
 Generates realistic simulated data for ports, routes, weather, and news
 """
 
+import itertools
 import random
+import secrets
+import threading
+import time
+from functools import lru_cache
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 import json
 
 
+# How long a generated timestamp is reused by standalone generator calls
+TIMESTAMP_REUSE_SECONDS = 0.1
+
+# Ports that run more congested than the rest
+HIGH_CONGESTION_PORTS = frozenset({'LAX', 'SHG', 'SGP'})
+
+# Weather severity distribution (more moderate/severe than extreme)
+SEVERITY_VALUES = ['light', 'moderate', 'severe', 'extreme']
+SEVERITY_PROBABILITIES = [0.3, 0.4, 0.25, 0.05]
+
+
 class DataSimulator:
     """
     Simulates real-time data from various sources:
@@ -23,6 +39,16 @@ class DataSimulator:
         random.seed(seed)
         np.random.seed(seed)
         
+        # One np.random.Generator per thread, spawned from a shared seed sequence; full-network
+        # batches draw from their own sequence so their output depends only on the seed
+        self._seed_sequence, self._batch_seed_sequence = np.random.SeedSequence(seed).spawn(2)
+        self._rng_local = threading.local()
+        self._rng_lock = threading.Lock()
+        
+        # Timestamp shared by all records generated in the same batch
+        self._ts_cache = None
+        self._ts_cache_time = 0.0
+        
         # Major global ports
         self.ports = [
             {'id': 'LAX', 'name': 'Los Angeles', 'country': 'USA', 'lat': 33.75, 'lon': -118.25, 'region': 'North America'},
@@ -37,23 +63,52 @@ class DataSimulator:
             {'id': 'TOK', 'name': 'Tokyo', 'country': 'Japan', 'lat': 35.68, 'lon': 139.77, 'region': 'Asia'},
         ]
         
-        # Generate routes between ports
+        # Generate routes between ports (pairwise distances in one vectorized pass)
+        distances = self._pairwise_distances()
+        origin_idx, dest_idx = np.triu_indices(len(self.ports), k=1)
         self.routes = []
-        for i, origin in enumerate(self.ports):
-            for dest in self.ports[i+1:]:
-                route_id = f"{origin['id']}-{dest['id']}"
-                distance = self._calculate_distance(
-                    origin['lat'], origin['lon'],
-                    dest['lat'], dest['lon']
-                )
-                self.routes.append({
-                    'route_id': route_id,
-                    'origin': origin['id'],
-                    'destination': dest['id'],
-                    'name': f"{origin['name']} → {dest['name']}",
-                    'distance_km': distance,
-                    'typical_duration_hours': distance / 25.0  # ~25 km/h average
-                })
+        for i, j in zip(origin_idx, dest_idx):
+            origin = self.ports[i]
+            dest = self.ports[j]
+            distance = float(distances[i, j])
+            self.routes.append({
+                'route_id': f"{origin['id']}-{dest['id']}",
+                'origin': origin['id'],
+                'destination': dest['id'],
+                'name': f"{origin['name']} → {dest['name']}",
+                'distance_km': distance,
+                'typical_duration_hours': distance / 25.0  # ~25 km/h average
+            })
+        
+        # Lookup indexes
+        self._port_by_id = {p['id']: p for p in self.ports}
+        self._route_by_id = {r['route_id']: r for r in self.routes}
+        self._ports_by_region: Dict[str, List[Dict]] = {}
+        for port in self.ports:
+            self._ports_by_region.setdefault(port['region'], []).append(port)
+        
+        # Static per-port fields, merged into each generated record
+        self._port_traffic_skeleton = {
+            pid: {'port_id': pid, 'port_name': p['name'], 'capacity': 100,
+                  'latitude': p['lat'], 'longitude': p['lon']}
+            for pid, p in self._port_by_id.items()
+        }
+        # Base congestion range per port
+        self._congestion_low = {
+            pid: 0.2 if pid in HIGH_CONGESTION_PORTS else 0.1 for pid in self._port_by_id
+        }
+        self._congestion_high = {
+            pid: 0.8 if pid in HIGH_CONGESTION_PORTS else 0.5 for pid in self._port_by_id
+        }
+        self._news_skeleton = {
+            pid: {'port_id': pid, 'port_name': p['name'], 'region': p['region']}
+            for pid, p in self._port_by_id.items()
+        }
+        
+        # Article ids: per-instance random prefix + monotonic counter, so ids
+        # never collide within a run or with articles stored by earlier runs
+        self._article_id_prefix = f"news_{secrets.token_hex(4)}_"
+        self._next_article_id = itertools.count()
         
         # Weather zones
         self.weather_zones = {
@@ -62,6 +117,9 @@ class DataSimulator:
             'Europe': ['storm', 'wind', 'ice'],
             'Middle East': ['wind', 'storm']
         }
+        self._region_names = list(self.weather_zones.keys())
+        self._severity_cdf = np.cumsum(SEVERITY_PROBABILITIES)
+        self._severity_cdf[-1] = 1.0
         
         # News templates
         self.news_templates = [
@@ -74,133 +132,308 @@ class DataSimulator:
             "Port {port} operations running smoothly",
             "Improved efficiency at {port} reduces wait times"
         ]
+        # Same templates as callables (port, issue, region) -> str, skipping str.format parsing
+        self._compiled_templates = [
+            lambda port, issue, region: f"Port {port} experiencing delays due to {issue}",
+            lambda port, issue, region: f"Weather alert: severe storm affecting {region} shipping lanes",
+            lambda port, issue, region: f"Congestion at {port} port reaches critical levels",
+            lambda port, issue, region: f"Supply chain disruption reported in {region}",
+            lambda port, issue, region: f"Vessel backlog at {port} causing extended wait times",
+            lambda port, issue, region: f"Storm system impacting {region} maritime operations",
+            lambda port, issue, region: f"Port {port} operations running smoothly",
+            lambda port, issue, region: f"Improved efficiency at {port} reduces wait times"
+        ]
+        self._neg_templates = self._compiled_templates[:6]
+        self._pos_templates = self._compiled_templates[6:]
+        self.news_issues = ['congestion', 'weather delays', 'equipment failure', 'labor strike', 'backlog']
+        self.news_sources = ['Maritime News', 'Shipping Times', 'Port Authority', 'Trade Journal']
     
-    def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """Calculate distance between two points (Haversine formula)"""
-        from math import radians, sin, cos, sqrt, atan2
-        R = 6371  # Earth radius in km
-        dlat = radians(lat2 - lat1)
-        dlon = radians(lon2 - lon1)
-        a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1-a))
-        return R * c
+    def _pairwise_distances(self) -> np.ndarray:
+        """Calculate NxN great-circle distances between all ports (Haversine formula)"""
+        R = 6371.0  # Earth radius in km
+        lats = np.deg2rad(np.fromiter((p['lat'] for p in self.ports), dtype=np.float64))
+        lons = np.deg2rad(np.fromiter((p['lon'] for p in self.ports), dtype=np.float64))
+        dlat = lats[:, None] - lats[None, :]
+        dlon = lons[:, None] - lons[None, :]
+        a = np.sin(dlat / 2)**2 + np.cos(lats)[:, None] * np.cos(lats)[None, :] * np.sin(dlon / 2)**2
+        return 2 * R * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    
+    @property
+    def _rng(self) -> np.random.Generator:
+        """Random generator for the calling thread"""
+        rng = getattr(self._rng_local, 'rng', None)
+        if rng is None:
+            with self._rng_lock:
+                child_seed = self._seed_sequence.spawn(1)[0]
+            rng = self._rng_local.rng = np.random.default_rng(child_seed)
+        return rng
+    
+    def _batch_timestamp(self, refresh: bool = False) -> str:
+        """
+        Get the ISO timestamp for the current generation batch
+        
+        Args:
+            refresh: Start a new batch with a fresh timestamp
+            
+        Returns:
+            Timestamp reused for calls within TIMESTAMP_REUSE_SECONDS
+        """
+        now = time.monotonic()
+        if refresh or self._ts_cache is None or now - self._ts_cache_time > TIMESTAMP_REUSE_SECONDS:
+            self._ts_cache = datetime.now().isoformat()
+            self._ts_cache_time = now
+        return self._ts_cache
+    
+    def get_port(self, port_id: str) -> Optional[Dict]:
+        """Get a port record by id"""
+        return self._port_by_id.get(port_id)
+    
+    def get_route(self, route_id: str) -> Optional[Dict]:
+        """Get a route record by id"""
+        return self._route_by_id.get(route_id)
+    
+    def get_region_ports(self, region: str) -> List[Dict]:
+        """Get all port records in a region"""
+        return self._ports_by_region.get(region, [])
     
     def generate_port_traffic(self, port_id: str) -> Dict:
         """Generate port traffic data"""
-        port = next((p for p in self.ports if p['id'] == port_id), None)
-        if not port:
+        skeleton = self._port_traffic_skeleton.get(port_id)
+        if not skeleton:
             return {}
         
         # Simulate congestion (some ports more congested)
-        base_congestion = random.uniform(0.2, 0.8) if port_id in ['LAX', 'SHG', 'SGP'] else random.uniform(0.1, 0.5)
+        base_congestion = random.uniform(self._congestion_low[port_id], self._congestion_high[port_id])
         
         vessel_count = int(30 + base_congestion * 40)
         wait_time = base_congestion * 48 + random.uniform(-10, 10)
         wait_time = max(0, wait_time)
         
         return {
-            'port_id': port_id,
-            'port_name': port['name'],
+            **skeleton,
             'vessel_count': vessel_count,
-            'capacity': 100,
             'wait_time_hours': round(wait_time, 2),
             'congestion_index': round(base_congestion, 3),
-            'timestamp': datetime.now().isoformat(),
-            'latitude': port['lat'],
-            'longitude': port['lon']
+            'timestamp': self._batch_timestamp()
         }
     
+    def generate_port_traffic_batch(self, port_ids: List[str],
+                                    rng: Optional[np.random.Generator] = None) -> List[Dict]:
+        """
+        Generate port traffic data for many ports with two vectorized draws
+        
+        Args:
+            port_ids: Port identifiers (may repeat)
+            rng: Random generator to draw from (defaults to the calling thread's)
+            
+        Returns:
+            Traffic dicts in the same order ({} for unknown ports)
+        """
+        known = [pid for pid in port_ids if pid in self._port_traffic_skeleton]
+        n = len(known)
+        lows = np.fromiter((self._congestion_low[pid] for pid in known), dtype=np.float64, count=n)
+        highs = np.fromiter((self._congestion_high[pid] for pid in known), dtype=np.float64, count=n)
+        
+        rng = rng or self._rng
+        base_congestion = rng.uniform(lows, highs)
+        jitter = rng.uniform(-10, 10, size=n)
+        vessel_counts = (30 + base_congestion * 40).astype(int)
+        wait_times = np.round(np.maximum(0, base_congestion * 48 + jitter), 2)
+        base_congestion = np.round(base_congestion, 3)
+        timestamp = self._batch_timestamp()
+        
+        generated = iter(range(n))
+        results = []
+        for pid in port_ids:
+            skeleton = self._port_traffic_skeleton.get(pid)
+            if not skeleton:
+                results.append({})
+                continue
+            i = next(generated)
+            results.append({
+                **skeleton,
+                'vessel_count': int(vessel_counts[i]),
+                'wait_time_hours': float(wait_times[i]),
+                'congestion_index': float(base_congestion[i]),
+                'timestamp': timestamp
+            })
+        
+        return results
+    
     def generate_weather_alert(self, region: str = None) -> Dict:
         """Generate weather alert data"""
-        if not region:
-            region = random.choice(list(self.weather_zones.keys()))
-        
-        weather_types = self.weather_zones.get(region, ['storm'])
-        weather_type = random.choice(weather_types)
+        return self.generate_weather_alerts_batch([region])[0]
+    
+    def generate_weather_alerts_batch(self, regions: List[Optional[str]],
+                                      rng: Optional[np.random.Generator] = None) -> List[Dict]:
+        """
+        Generate weather alerts for many regions with vectorized draws
         
-        # Severity distribution (more moderate/severe than extreme)
-        severity_weights = ['light', 'moderate', 'severe', 'extreme']
-        severity = np.random.choice(severity_weights, p=[0.3, 0.4, 0.25, 0.05])
+        Args:
+            regions: Region per alert (None picks a random region)
+            rng: Random generator to draw from (defaults to the calling thread's)
+            
+        Returns:
+            Weather alert dicts in the same order
+        """
+        n = len(regions)
+        rng = rng or self._rng
+        timestamp = self._batch_timestamp()
         
-        duration = random.uniform(6, 72) if severity in ['severe', 'extreme'] else random.uniform(2, 24)
+        region_draws = rng.integers(0, len(self._region_names), n)
+        type_draws = rng.random(n)
+        severity_idx = np.searchsorted(self._severity_cdf, rng.random(n), side='right')
+        port_draws = rng.random(n)
+        long_durations = rng.uniform(6, 72, n)
+        short_durations = rng.uniform(2, 24, n)
         
-        # Get a port in this region
-        region_ports = [p for p in self.ports if p['region'] == region]
-        affected_port = random.choice(region_ports) if region_ports else self.ports[0]
+        alerts = []
+        for i, region in enumerate(regions):
+            if not region:
+                region = self._region_names[region_draws[i]]
+            
+            weather_types = self.weather_zones.get(region, ['storm'])
+            weather_type = weather_types[int(type_draws[i] * len(weather_types))]
+            
+            severity = SEVERITY_VALUES[severity_idx[i]]
+            duration = long_durations[i] if severity in ('severe', 'extreme') else short_durations[i]
+            
+            # Get a port in this region
+            region_ports = self._ports_by_region.get(region)
+            affected_port = (
+                region_ports[int(port_draws[i] * len(region_ports))] if region_ports else self.ports[0]
+            )
+            
+            alerts.append({
+                'weather_zone': region,
+                'type': weather_type,
+                'severity': severity,
+                'duration_hours': round(float(duration), 1),
+                'affected_port_id': affected_port['id'],
+                'affected_port_name': affected_port['name'],
+                'latitude': affected_port['lat'],
+                'longitude': affected_port['lon'],
+                'timestamp': timestamp
+            })
         
-        return {
-            'weather_zone': region,
-            'type': weather_type,
-            'severity': severity,
-            'duration_hours': round(duration, 1),
-            'affected_port_id': affected_port['id'],
-            'affected_port_name': affected_port['name'],
-            'latitude': affected_port['lat'],
-            'longitude': affected_port['lon'],
-            'timestamp': datetime.now().isoformat()
-        }
+        return alerts
     
     def generate_news_article(self, port_id: str = None, region: str = None) -> Dict:
         """Generate news article with sentiment"""
         if not port_id:
             port = random.choice(self.ports)
-            port_id = port['id']
-            port_name = port['name']
-            region = port['region']
         else:
-            port = next((p for p in self.ports if p['id'] == port_id), self.ports[0])
-            port_name = port['name']
-            region = port['region']
+            port = self._port_by_id.get(port_id, self.ports[0])
+        skeleton = self._news_skeleton[port['id']]
+        port_name = skeleton['port_name']
+        region = skeleton['region']
         
         # Determine if article is negative (disruption) or positive
         is_negative = random.random() < 0.6  # 60% chance of negative news
         
         if is_negative:
-            issues = ['congestion', 'weather delays', 'equipment failure', 'labor strike', 'backlog']
-            issue = random.choice(issues)
-            template = random.choice(self.news_templates[:6])  # Negative templates
-            content = template.format(port=port_name, issue=issue, region=region, 
-                                    severity='severe', type='storm')
+            issue = random.choice(self.news_issues)
+            template = random.choice(self._neg_templates)
+            content = template(port_name, issue, region)
             sentiment_score = random.uniform(-0.8, -0.2)
         else:
-            template = random.choice(self.news_templates[6:])  # Positive templates
-            content = template.format(port=port_name, region=region)
+            template = random.choice(self._pos_templates)
+            content = template(port_name, None, region)
             sentiment_score = random.uniform(0.2, 0.8)
         
         return {
-            'article_id': f"news_{random.randint(1000, 9999)}",
+            **skeleton,
+            'article_id': f"{self._article_id_prefix}{next(self._next_article_id):012d}",
             'title': content[:80] + '...',
             'content': content,
-            'source': random.choice(['Maritime News', 'Shipping Times', 'Port Authority', 'Trade Journal']),
-            'port_id': port_id,
-            'port_name': port_name,
-            'region': region,
+            'source': random.choice(self.news_sources),
             'sentiment_score': round(sentiment_score, 3),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': self._batch_timestamp()
         }
     
+    def generate_news_articles_batch(self, port_id: str, n: int,
+                                     rng: Optional[np.random.Generator] = None) -> List[Dict]:
+        """
+        Generate n news articles for a port with vectorized random draws
+        
+        Args:
+            port_id: Port the articles are about
+            n: Number of articles to generate
+            rng: Random generator to draw from (defaults to the calling thread's)
+            
+        Returns:
+            List of article dicts (same shape as generate_news_article)
+        """
+        port = self._port_by_id.get(port_id, self.ports[0])
+        skeleton = self._news_skeleton[port['id']]
+        port_name = skeleton['port_name']
+        region = skeleton['region']
+        timestamp = self._batch_timestamp()
+        
+        # Draw everything up front: polarity, template, issue, source, sentiment
+        rng = rng or self._rng
+        is_negative = rng.random(n) < 0.6  # 60% chance of negative news
+        template_idx = np.where(
+            is_negative,
+            rng.integers(0, 6, n),  # Negative templates
+            rng.integers(6, len(self.news_templates), n)  # Positive templates
+        )
+        issue_idx = rng.integers(0, len(self.news_issues), n)
+        source_idx = rng.integers(0, len(self.news_sources), n)
+        sentiment_scores = np.round(np.where(
+            is_negative,
+            rng.uniform(-0.8, -0.2, n),
+            rng.uniform(0.2, 0.8, n)
+        ), 3)
+        article_ids = [next(self._next_article_id) for _ in range(n)]
+        
+        articles = []
+        for i in range(n):
+            content = self._compiled_templates[template_idx[i]](
+                port_name, self.news_issues[issue_idx[i]], region
+            )
+            articles.append({
+                **skeleton,
+                'article_id': f"{self._article_id_prefix}{article_ids[i]:012d}",
+                'title': content[:80] + '...',
+                'content': content,
+                'source': self.news_sources[source_idx[i]],
+                'sentiment_score': float(sentiment_scores[i]),
+                'timestamp': timestamp
+            })
+        
+        return articles
+    
     def generate_route_data(self, route_id: str = None) -> Dict:
         """Generate complete route data with all risk factors"""
+        rng = self._rng
         if not route_id:
-            route = random.choice(self.routes)
+            route = self.routes[rng.integers(len(self.routes))]
         else:
-            route = next((r for r in self.routes if r['route_id'] == route_id), self.routes[0])
-        
-        # Get port data
-        origin_port = next(p for p in self.ports if p['id'] == route['origin'])
-        dest_port = next(p for p in self.ports if p['id'] == route['destination'])
+            route = self._route_by_id.get(route_id, self.routes[0])
         
         # Generate data for both ports
-        origin_traffic = self.generate_port_traffic(route['origin'])
-        dest_traffic = self.generate_port_traffic(route['destination'])
+        origin_traffic, dest_traffic = self.generate_port_traffic_batch(
+            [route['origin'], route['destination']], rng
+        )
+        
+        return self._assemble_route_data(route, origin_traffic, dest_traffic, rng)
+    
+    def _assemble_route_data(self, route: Dict, origin_traffic: Dict, dest_traffic: Dict,
+                             rng: np.random.Generator) -> Dict:
+        """Combine port traffic with generated weather and news for a route (all draws from rng)"""
+        origin_port = self._port_by_id[route['origin']]
+        dest_port = self._port_by_id[route['destination']]
         
         # Generate weather for regions
-        origin_weather = self.generate_weather_alert(origin_port['region'])
-        dest_weather = self.generate_weather_alert(dest_port['region'])
+        origin_weather, dest_weather = self.generate_weather_alerts_batch(
+            [origin_port['region'], dest_port['region']], rng
+        )
         
         # Generate news articles
-        origin_news = [self.generate_news_article(route['origin']) for _ in range(random.randint(1, 5))]
-        dest_news = [self.generate_news_article(route['destination']) for _ in range(random.randint(1, 5))]
+        origin_count, dest_count = rng.integers(1, 6, size=2)
+        origin_news = self.generate_news_articles_batch(route['origin'], int(origin_count), rng)
+        dest_news = self.generate_news_articles_batch(route['destination'], int(dest_count), rng)
         
         return {
             'route_id': route['route_id'],
@@ -217,10 +450,33 @@ class DataSimulator:
                 'weather': dest_weather,
                 'news': dest_news
             },
-            'timestamp': datetime.now().isoformat()
+            'timestamp': self._batch_timestamp()
         }
     
     def generate_all_routes_data(self) -> List[Dict]:
-        """Generate data for all routes"""
-        return [self.generate_route_data(route['route_id']) for route in self.routes]
+        """Generate data for all routes (reproducible for a seed: the n-th call draws the same values)"""
+        self._batch_timestamp(refresh=True)
+        
+        # One generator for the traffic batch plus one per route, spawned in route order
+        with self._rng_lock:
+            batch_seed = self._batch_seed_sequence.spawn(1)[0]
+        traffic_rng, *route_rngs = [
+            np.random.default_rng(child) for child in batch_seed.spawn(len(self.routes) + 1)
+        ]
+        
+        # Draw traffic for every origin/destination slot in one batch
+        port_ids = [pid for route in self.routes for pid in (route['origin'], route['destination'])]
+        traffic = self.generate_port_traffic_batch(port_ids, traffic_rng)
+        
+        # Assembling is GIL-bound dict building, so it runs serially (a thread pool was slower)
+        return [
+            self._assemble_route_data(route, origin_traffic, dest_traffic, route_rng)
+            for route, origin_traffic, dest_traffic, route_rng
+            in zip(self.routes, traffic[0::2], traffic[1::2], route_rngs)
+        ]
+
 
+@lru_cache(maxsize=None)
+def get_simulator(seed: int = 42) -> DataSimulator:
+    """Get the shared simulator instance for a seed"""
+    return DataSimulator(seed)
@@ -3,11 +3,18 @@ Ontology Layer for Supply Chain Entities and Relationships
 Defines the knowledge graph structure
 """
 
+from collections import defaultdict
 from typing import Dict, List, Optional, Set
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 
+import numpy as np
+
+
+# Growth step for the structure-of-arrays metric buffers
+_ARRAY_CHUNK = 64
+
 
 class RiskLevel(Enum):
     LOW = "low"
@@ -82,39 +89,56 @@ class SupplyChainOntology:
         self.risk_factors: Dict[str, RiskFactor] = {}
         
         # Relationship mappings
-        self.port_to_routes: Dict[str, Set[str]] = {}  # port_id -> set of route_ids
+        self.port_to_routes: Dict[str, Set[str]] = defaultdict(set)  # port_id -> set of route_ids
         self.route_to_ports: Dict[str, Set[str]] = {}  # route_id -> set of port_ids
         self.port_to_weather_zones: Dict[str, str] = {}  # port_id -> weather_zone
         self.port_to_regions: Dict[str, str] = {}  # port_id -> region
-        self.weather_zone_to_ports: Dict[str, Set[str]] = {}  # weather_zone -> set of port_ids
-        self.region_to_ports: Dict[str, Set[str]] = {}  # region -> set of port_ids
+        self.weather_zone_to_ports: Dict[str, Set[str]] = defaultdict(set)  # weather_zone -> set of port_ids
+        self.region_to_ports: Dict[str, Set[str]] = defaultdict(set)  # region -> set of port_ids
+        
+        # Structure-of-arrays view of hot metrics for bulk queries
+        self._route_ids: List[str] = []
+        self._route_index: Dict[str, int] = {}  # route_id -> array slot
+        self._route_risk = np.zeros(0, dtype=np.float64)
+        self._port_index: Dict[str, int] = {}  # port_id -> array slot
+        self._port_congestion = np.zeros(0, dtype=np.float64)
+        self._port_wait_time = np.zeros(0, dtype=np.float64)
     
     def add_port(self, port: Port):
         """Add a port to the ontology"""
         self.ports[port.port_id] = port
         
+        slot = self._port_index.setdefault(port.port_id, len(self._port_index))
+        if slot >= len(self._port_congestion):
+            self._port_congestion = self._grow(self._port_congestion)
+            self._port_wait_time = self._grow(self._port_wait_time)
+        self._port_congestion[slot] = port.congestion_index
+        self._port_wait_time[slot] = port.wait_time_hours
+        
         # Update relationships
         if port.weather_zone:
             self.port_to_weather_zones[port.port_id] = port.weather_zone
-            if port.weather_zone not in self.weather_zone_to_ports:
-                self.weather_zone_to_ports[port.weather_zone] = set()
             self.weather_zone_to_ports[port.weather_zone].add(port.port_id)
         
         if port.region:
             self.port_to_regions[port.port_id] = port.region
-            if port.region not in self.region_to_ports:
-                self.region_to_ports[port.region] = set()
             self.region_to_ports[port.region].add(port.port_id)
     
     def add_route(self, route: Route):
         """Add a route to the ontology"""
         self.routes[route.route_id] = route
         
+        if route.route_id not in self._route_index:
+            self._route_index[route.route_id] = len(self._route_ids)
+            self._route_ids.append(route.route_id)
+        slot = self._route_index[route.route_id]
+        if slot >= len(self._route_risk):
+            self._route_risk = self._grow(self._route_risk)
+        self._route_risk[slot] = route.risk_score
+        
         # Update port-route relationships
-        for port_id in [route.origin_port_id, route.destination_port_id]:
-            if port_id not in self.port_to_routes:
-                self.port_to_routes[port_id] = set()
-            self.port_to_routes[port_id].add(route.route_id)
+        self.port_to_routes[route.origin_port_id].add(route.route_id)
+        self.port_to_routes[route.destination_port_id].add(route.route_id)
         
         self.route_to_ports[route.route_id] = {
             route.origin_port_id, route.destination_port_id
@@ -158,6 +182,10 @@ class SupplyChainOntology:
             port.current_vessels = metrics.get('vessel_count', port.current_vessels)
             port.wait_time_hours = metrics.get('wait_time_hours', port.wait_time_hours)
             port.congestion_index = metrics.get('congestion_index', port.congestion_index)
+            
+            slot = self._port_index[port_id]
+            self._port_congestion[slot] = port.congestion_index
+            self._port_wait_time[slot] = port.wait_time_hours
     
     def update_route_risk(self, route_id: str, risk_score: float, risk_level: RiskLevel):
         """Update route risk assessment"""
@@ -165,10 +193,42 @@ class SupplyChainOntology:
             route = self.routes[route_id]
             route.risk_score = risk_score
             route.risk_level = risk_level
+            self._route_risk[self._route_index[route_id]] = risk_score
     
     def get_top_risk_routes(self, limit: int = 10) -> List[Route]:
         """Get top N routes by risk score"""
-        all_routes = list(self.routes.values())
-        sorted_routes = sorted(all_routes, key=lambda r: r.risk_score, reverse=True)
-        return sorted_routes[:limit]
+        n = len(self._route_ids)
+        if limit <= 0 or n == 0:
+            return []
+        
+        risk = self._route_risk[:n]
+        if limit < n:
+            candidates = np.argpartition(-risk, limit - 1)[:limit]
+        else:
+            candidates = np.arange(n)
+        top = candidates[np.argsort(-risk[candidates], kind='stable')]
+        return [self.routes[self._route_ids[i]] for i in top]
+    
+    def get_risk_summary(self) -> Dict:
+        """Get aggregate route risk and port congestion statistics"""
+        route_risk = self._route_risk[:len(self._route_ids)]
+        port_congestion = self._port_congestion[:len(self._port_index)]
+        port_wait_time = self._port_wait_time[:len(self._port_index)]
+        
+        return {
+            'route_count': int(route_risk.size),
+            'avg_route_risk': float(route_risk.mean()) if route_risk.size else 0.0,
+            'max_route_risk': float(route_risk.max()) if route_risk.size else 0.0,
+            'p90_route_risk': float(np.percentile(route_risk, 90)) if route_risk.size else 0.0,
+            'port_count': int(port_congestion.size),
+            'avg_port_congestion': float(port_congestion.mean()) if port_congestion.size else 0.0,
+            'avg_port_wait_hours': float(port_wait_time.mean()) if port_wait_time.size else 0.0
+        }
+    
+    @staticmethod
+    def _grow(array: np.ndarray) -> np.ndarray:
+        """Extend a metric buffer by one chunk"""
+        grown = np.zeros(len(array) + _ARRAY_CHUNK, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
 
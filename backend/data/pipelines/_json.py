@@ -0,0 +1,105 @@
+"""
+JSON encoding and file helpers for pipeline storage
+Uses orjson when available, falling back to the standard library
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+try:
+    import orjson
+
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def dumps(obj, indent: bool = False) -> bytes:
+        """Serialize to compact JSON bytes (2-space indent if indent=True)"""
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+
+    def loads(data):
+        """Deserialize JSON bytes or str"""
+        return orjson.loads(data)
+
+except ImportError:
+    import json
+
+    JSONDecodeError = json.JSONDecodeError
+
+    def dumps(obj, indent: bool = False) -> bytes:
+        """Serialize to compact JSON bytes (2-space indent if indent=True)"""
+        if indent:
+            return json.dumps(obj, indent=2).encode()
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+    def loads(data):
+        """Deserialize JSON bytes or str"""
+        return json.loads(data)
+
+
+def write_atomic(path: Path, payload: bytes):
+    """Write a file via temp file + rename so readers never see a partial write"""
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_file, path)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
+
+def cache_remaining(cache_file: Path, ttl_seconds: float) -> float:
+    """Seconds until a cache file expires, from its mtime (<= 0 if expired or missing)"""
+    try:
+        mtime = cache_file.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+    return ttl_seconds - (time.time() - mtime)
+
+
+class TTLCache:
+    """
+    In-process cache in front of the file caches
+    Entries expire on the monotonic clock; the oldest are evicted beyond max_entries
+    """
+    
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        """
+        Initialize cache
+        
+        Args:
+            ttl_seconds: Default time to live of an entry
+            max_entries: Maximum number of entries kept
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}  # key -> (monotonic deadline, data)
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get an unexpired entry (None if missing or expired)"""
+        hit = self._entries.get(key)
+        if hit and time.monotonic() < hit[0]:
+            return hit[1]
+        return None
+    
+    def put(self, key: Hashable, data: Any, ttl_seconds: Optional[float] = None):
+        """Store an entry (for ttl_seconds, defaulting to the cache's TTL)"""
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+        now = time.monotonic()
+        
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                # Drop expired entries first, then the oldest insertions
+                for stale in [k for k, (deadline, _) in self._entries.items() if deadline <= now]:
+                    del self._entries[stale]
+                while len(self._entries) >= self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = (now + ttl_seconds, data)
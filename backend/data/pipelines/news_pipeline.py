@@ -4,13 +4,18 @@ Simulates NewsAPI ingestion with sentiment analysis
 """
 
 import os
-import json
+import threading
+import msgpack
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import random
 
-from backend.data.data_simulator import DataSimulator
+from backend.data.data_simulator import get_simulator
+from backend.data.pipelines import _json
+
+# Longest query window; older articles are dropped from the index and their shards skipped
+INDEX_RETENTION_HOURS = 168
 
 
 class NewsPipeline:
@@ -32,8 +37,21 @@ class NewsPipeline:
         self.data_dir = Path(data_dir) / 'news'
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
-        self.simulator = DataSimulator()
+        self.simulator = get_simulator()
         self.cache_duration = timedelta(minutes=15)  # Cache for 15 minutes
+        
+        # Cache file per query scope (port, region or 'all')
+        cache_keys = [p['id'] for p in self.simulator.ports] + list(self.simulator.weather_zones) + ['all']
+        self._cache_files: Dict[str, Path] = {
+            key: self.data_dir / f"{key}_articles.msgpack" for key in cache_keys
+        }
+        
+        # In-memory index of stored articles:
+        # article_id -> (timestamp, port_id, sentiment_score, shard, byte offset)
+        self._index: Dict[str, Tuple[str, Optional[str], float, Path, int]] = {}
+        self._store_lock = threading.Lock()  # Keeps shard appends and their offsets consistent
+        self._pruned_hour: Optional[str] = None  # Hour the index was last pruned in
+        self._build_index()
     
     def ingest_news_articles(self, 
                             port_id: Optional[str] = None,
@@ -52,14 +70,15 @@ class NewsPipeline:
         Returns:
             List of news articles
         """
-        cache_key = f"{port_id or region or 'all'}_{limit}"
-        cache_file = self.data_dir / f"{cache_key}_articles.json"
+        cache_key = port_id or region or 'all'
+        cache_file = self._cache_files.get(cache_key) or self.data_dir / f"{cache_key}_articles.msgpack"
         
-        # Check cache
+        # Check cache (a batch generated with a larger limit also satisfies smaller ones)
         if not force_refresh and cache_file.exists():
             cache_data = self._load_cache(cache_file)
-            if cache_data and self._is_cache_valid(cache_data):
-                return cache_data['data']
+            if (cache_data and self._is_cache_valid(cache_data)
+                    and cache_data.get('limit', 0) >= limit):
+                return cache_data['data'][:limit]
         
         # Generate articles
         articles = []
@@ -72,7 +91,7 @@ class NewsPipeline:
                 articles.append(article)
         elif region:
             # Generate articles for region
-            region_ports = [p for p in self.simulator.ports if p['region'] == region]
+            region_ports = self.simulator.get_region_ports(region)
             for _ in range(article_count):
                 port = random.choice(region_ports) if region_ports else None
                 article = self.simulator.generate_news_article(
@@ -87,11 +106,10 @@ class NewsPipeline:
                 articles.append(article)
         
         # Store in cache
-        self._save_cache(cache_file, articles)
+        self._save_cache(cache_file, articles, limit=limit)
         
-        # Store individual articles
-        for article in articles:
-            self._store_article(article)
+        # Append articles to their hourly shards
+        self._store_articles(articles)
         
         return articles
     
@@ -104,43 +122,32 @@ class NewsPipeline:
         
         Args:
             port_id: Filter by port
-            hours: Time window in hours
+            hours: Time window in hours (at most INDEX_RETENTION_HOURS)
             min_sentiment: Minimum sentiment score threshold (for negative sentiment)
             
         Returns:
             List of recent articles
         """
-        articles_dir = self.data_dir / 'articles'
-        if not articles_dir.exists():
-            return []
-        
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        articles = []
+        cutoff_iso = (datetime.now() - timedelta(hours=hours)).isoformat()
+        matches = []
         
-        for article_file in articles_dir.glob('*.json'):
-            try:
-                with open(article_file, 'r') as f:
-                    article = json.load(f)
-                
-                article_time = datetime.fromisoformat(article['timestamp'])
-                if article_time >= cutoff_time:
-                    # Apply filters
-                    if port_id and article.get('port_id') != port_id:
-                        continue
-                    
-                    if min_sentiment is not None:
-                        sentiment = article.get('sentiment_score', 0)
-                        if sentiment > min_sentiment:  # More positive than threshold
-                            continue
-                    
-                    articles.append(article)
-            except (json.JSONDecodeError, KeyError):
+        for timestamp, article_port_id, sentiment, shard, offset in list(self._index.values()):
+            if timestamp < cutoff_iso:
                 continue
+            
+            # Apply filters
+            if port_id and article_port_id != port_id:
+                continue
+            
+            if min_sentiment is not None and sentiment > min_sentiment:  # More positive than threshold
+                continue
+            
+            matches.append((timestamp, shard, offset))
         
         # Sort by timestamp (newest first)
-        articles.sort(key=lambda a: a.get('timestamp', ''), reverse=True)
+        matches.sort(key=lambda m: m[0], reverse=True)
         
-        return articles
+        return self._load_articles([(shard, offset) for _, shard, offset in matches])
     
     def get_articles_by_sentiment(self, 
                                  port_id: Optional[str] = None,
@@ -155,48 +162,155 @@ class NewsPipeline:
         Returns:
             Dict with 'negative' and 'positive' keys
         """
-        articles = self.get_recent_articles(port_id=port_id, hours=168)  # Last week
-        
-        grouped = {'negative': [], 'positive': [], 'neutral': []}
+        cutoff_iso = (datetime.now() - timedelta(hours=INDEX_RETENTION_HOURS)).isoformat()  # Last week
         
-        for article in articles:
-            sentiment = article.get('sentiment_score', 0)
+        # Bucket straight off the index, only loading articles that are returned
+        buckets = {'negative': [], 'positive': [], 'neutral': []}
+        for timestamp, article_port_id, sentiment, shard, offset in list(self._index.values()):
+            if timestamp < cutoff_iso:
+                continue
+            if port_id and article_port_id != port_id:
+                continue
+            
             if sentiment < -0.3:
-                grouped['negative'].append(article)
+                buckets['negative'].append((timestamp, shard, offset))
             elif sentiment > 0.3:
-                grouped['positive'].append(article)
+                buckets['positive'].append((timestamp, shard, offset))
             else:
-                grouped['neutral'].append(article)
+                buckets['neutral'].append((timestamp, shard, offset))
         
         if negative_only:
-            return {'negative': grouped['negative']}
+            buckets = {'negative': buckets['negative']}
+        
+        grouped = {}
+        for label, entries in buckets.items():
+            entries.sort(key=lambda e: e[0], reverse=True)
+            grouped[label] = self._load_articles([(shard, offset) for _, shard, offset in entries])
         
         return grouped
     
-    def _store_article(self, article: Dict):
-        """Store individual article"""
+    def _store_articles(self, articles: List[Dict]):
+        """Append articles to hourly JSONL shards (articles/YYYY-MM-DD-HH.jsonl)"""
+        shards: Dict[str, List[Dict]] = {}
+        for article in articles:
+            timestamp = article.get('timestamp') or datetime.now().isoformat()
+            shards.setdefault(timestamp[:13].replace('T', '-'), []).append(article)
+        
+        articles_dir = self.data_dir / 'articles'
+        articles_dir.mkdir(parents=True, exist_ok=True)
+        
+        with self._store_lock:
+            for hour_key, shard_articles in shards.items():
+                shard = articles_dir / f"{hour_key}.jsonl"
+                with open(shard, 'ab') as f:
+                    for article in shard_articles:
+                        offset = f.tell()
+                        f.write(_json.dumps(article) + b'\n')
+                        self._index_article(article, shard, offset)
+            
+            # Prune at most once per hour, when a new shard hour starts
+            current_hour = datetime.now().isoformat()[:13]
+            if current_hour != self._pruned_hour:
+                self._prune_index()
+                self._pruned_hour = current_hour
+    
+    def _retention_cutoff(self) -> str:
+        """ISO timestamp before which articles fall outside every query window"""
+        return (datetime.now() - timedelta(hours=INDEX_RETENTION_HOURS)).isoformat()
+    
+    def _prune_index(self):
+        """Drop index entries older than the retention window (shards stay on disk)"""
+        cutoff_iso = self._retention_cutoff()
+        self._index = {
+            article_id: entry for article_id, entry in self._index.items() if entry[0] >= cutoff_iso
+        }
+    
+    def _index_article(self, article: Dict, shard: Path, offset: int):
+        """Add a stored article to the in-memory index"""
         article_id = article.get('article_id', f"article_{datetime.now().timestamp()}")
-        article_file = self.data_dir / f"articles/{article_id}.json"
-        article_file.parent.mkdir(parents=True, exist_ok=True)
+        self._index[article_id] = (
+            article.get('timestamp', ''),
+            article.get('port_id'),
+            article.get('sentiment_score', 0.0),
+            shard,
+            offset
+        )
+    
+    def _build_index(self):
+        """Populate the in-memory index from article shards already on disk"""
+        articles_dir = self.data_dir / 'articles'
+        if not articles_dir.exists():
+            return
+        
+        # Shards are named by hour, so whole shards outside the window can be skipped unread
+        cutoff_hour = self._retention_cutoff()[:13].replace('T', '-')
+        for shard in sorted(articles_dir.glob('*.jsonl')):
+            if shard.stem < cutoff_hour:
+                continue
+            offset = 0
+            with open(shard, 'rb') as f:
+                for line in f:
+                    try:
+                        self._index_article(_json.loads(line), shard, offset)
+                    except _json.JSONDecodeError:
+                        pass
+                    offset += len(line)
+        
+        self._migrate_legacy_articles(articles_dir)
+    
+    def _migrate_legacy_articles(self, articles_dir: Path):
+        """Move per-article files from the old layout (articles/{article_id}.json) into the shards"""
+        legacy_files = sorted(articles_dir.glob('*.json'))
+        articles, migrated = [], []
+        for legacy_file in legacy_files:
+            try:
+                with open(legacy_file, 'rb') as f:
+                    articles.append(_json.loads(f.read()))
+            except (OSError, _json.JSONDecodeError):
+                continue  # Leave unreadable files in place
+            migrated.append(legacy_file)
+        
+        # Shard (and index) first so a crash midway only re-migrates, never loses articles
+        self._store_articles(articles)
+        for legacy_file in migrated:
+            legacy_file.unlink(missing_ok=True)
+    
+    def _load_articles(self, locations: List[Tuple[Path, int]]) -> List[Dict]:
+        """Load stored articles by (shard, offset), opening each shard once"""
+        offsets_by_shard: Dict[Path, List[int]] = {}
+        for shard, offset in locations:
+            offsets_by_shard.setdefault(shard, []).append(offset)
+        
+        loaded = {}
+        for shard, offsets in offsets_by_shard.items():
+            try:
+                with open(shard, 'rb') as f:
+                    for offset in sorted(offsets):
+                        f.seek(offset)
+                        try:
+                            loaded[(shard, offset)] = _json.loads(f.readline())
+                        except _json.JSONDecodeError:
+                            continue
+            except FileNotFoundError:
+                continue
         
-        with open(article_file, 'w') as f:
-            json.dump(article, f, indent=2)
+        return [loaded[location] for location in locations if location in loaded]
     
-    def _save_cache(self, cache_file: Path, data: List[Dict]):
+    def _save_cache(self, cache_file: Path, data: List[Dict], limit: int = 0):
         """Save data to cache file"""
         cache_data = {
             'timestamp': datetime.now().isoformat(),
+            'limit': limit,
             'data': data
         }
-        with open(cache_file, 'w') as f:
-            json.dump(cache_data, f, indent=2)
+        _json.write_atomic(cache_file, msgpack.packb(cache_data, use_bin_type=True))
     
     def _load_cache(self, cache_file: Path) -> Optional[Dict]:
         """Load data from cache file"""
         try:
-            with open(cache_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            with open(cache_file, 'rb') as f:
+                return msgpack.unpackb(f.read(), raw=False)
+        except (FileNotFoundError, ValueError, msgpack.UnpackException):
             return None
     
     def _is_cache_valid(self, cache_data: Dict) -> bool:
@@ -204,6 +318,6 @@ class NewsPipeline:
         if 'timestamp' not in cache_data:
             return False
         
-        cache_time = datetime.fromisoformat(cache_data['timestamp'])
-        return datetime.now() - cache_time < self.cache_duration
+        # ISO-8601 timestamps sort lexicographically
+        return cache_data['timestamp'] > (datetime.now() - self.cache_duration).isoformat()
 
@@ -4,13 +4,16 @@ Coordinates all data ingestion pipelines
 """
 
 import os
+import time
 import asyncio
-from typing import Dict, List, Optional
+import numpy as np
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
+from backend.data.data_simulator import get_simulator
 from backend.data.pipelines.port_traffic_pipeline import PortTrafficPipeline
-from backend.data.pipelines.weather_pipeline import WeatherPipeline
+from backend.data.pipelines.weather_pipeline import WeatherPipeline, SEVERITY_LEVELS
 from backend.data.pipelines.news_pipeline import NewsPipeline
 
 
@@ -37,10 +40,13 @@ class PipelineOrchestrator:
         self.port_traffic = PortTrafficPipeline(data_dir)
         self.weather = WeatherPipeline(data_dir)
         self.news = NewsPipeline(data_dir)
+        
+        # Bumped on every forced refresh so downstream caches can tell the data changed
+        self.generation = 0
     
-    def ingest_all_data(self, force_refresh: bool = False) -> Dict:
+    async def ingest_all_data(self, force_refresh: bool = False) -> Dict:
         """
-        Ingest data from all sources
+        Ingest data from all sources concurrently
         
         Args:
             force_refresh: Force refresh all caches
@@ -48,34 +54,36 @@ class PipelineOrchestrator:
         Returns:
             Dict with all ingested data
         """
-        result = {
-            'timestamp': datetime.now().isoformat(),
-            'ports': [],
-            'weather': [],
-            'news': {}
-        }
-        
-        # Ingest port traffic
-        result['ports'] = self.port_traffic.ingest_all_ports()
-        
-        # Ingest weather alerts
-        result['weather'] = self.weather.ingest_weather_alerts(force_refresh=force_refresh)
-        
-        # Ingest news articles (by region)
         regions = ['North America', 'Asia', 'Europe', 'Middle East']
-        result['news'] = {}
-        for region in regions:
-            result['news'][region] = self.news.ingest_news_articles(
-                region=region,
-                limit=10,
-                force_refresh=force_refresh
-            )
         
-        return result
+        # Port traffic, weather alerts and news by region run in worker threads
+        ports, weather, *news = await asyncio.gather(
+            asyncio.to_thread(self.port_traffic.ingest_all_ports),
+            asyncio.to_thread(self.weather.ingest_weather_alerts, force_refresh=force_refresh),
+            *[
+                asyncio.to_thread(
+                    self.news.ingest_news_articles,
+                    region=region,
+                    limit=10,
+                    force_refresh=force_refresh
+                )
+                for region in regions
+            ]
+        )
+        
+        if force_refresh:
+            self.generation += 1
+        
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'ports': ports,
+            'weather': weather,
+            'news': dict(zip(regions, news))
+        }
     
-    def ingest_route_data(self, route_id: str, force_refresh: bool = False) -> Dict:
+    async def ingest_route_data(self, route_id: str, force_refresh: bool = False) -> Dict:
         """
-        Ingest all data for a specific route
+        Ingest all data for a specific route (sources fetched concurrently)
         
         Args:
             route_id: Route identifier (e.g., 'LAX-SHG')
@@ -84,69 +92,147 @@ class PipelineOrchestrator:
         Returns:
             Complete route data with all sources
         """
-        from backend.data.data_simulator import DataSimulator
-        
-        simulator = DataSimulator()
-        route = next((r for r in simulator.routes if r['route_id'] == route_id), None)
+        route = get_simulator().get_route(route_id)
         
         if not route:
             return {}
         
-        origin_id = route['origin']
-        dest_id = route['destination']
-        
-        # Get port data
-        origin_port = next(p for p in simulator.ports if p['id'] == origin_id)
-        dest_port = next(p for p in simulator.ports if p['id'] == dest_id)
+        origin, dest = await asyncio.gather(
+            self._ingest_port_data(route['origin'], force_refresh),
+            self._ingest_port_data(route['destination'], force_refresh)
+        )
         
-        # Ingest all data sources
-        origin_traffic = self.port_traffic.ingest_port_traffic(origin_id, force_refresh)
-        dest_traffic = self.port_traffic.ingest_port_traffic(dest_id, force_refresh)
-        
-        origin_weather = self.weather.get_weather_for_port(origin_id)
-        dest_weather = self.weather.get_weather_for_port(dest_id)
+        return self._route_record(route, origin, dest, datetime.now().isoformat())
+    
+    async def ingest_routes_data(self, route_ids: List[str], force_refresh: bool = False) -> List[Dict]:
+        """
+        Ingest data for many routes, fetching each distinct region and port once, concurrently
         
-        origin_news = self.news.ingest_news_articles(port_id=origin_id, limit=5, force_refresh=force_refresh)
-        dest_news = self.news.ingest_news_articles(port_id=dest_id, limit=5, force_refresh=force_refresh)
+        Args:
+            route_ids: Route identifiers
+            force_refresh: Force refresh caches
+            
+        Returns:
+            Route data (same shape as ingest_route_data) for every known route, in order
+        """
+        simulator = get_simulator()
+        routes = [route for route in map(simulator.get_route, route_ids) if route]
+        port_ids = list(dict.fromkeys(
+            port_id for route in routes for port_id in (route['origin'], route['destination'])
+        ))
+        
+        # Warm each region's weather first so ports in the same region share one batch of alerts
+        regions = {simulator.get_port(port_id)['region'] for port_id in port_ids}
+        await asyncio.gather(*[
+            asyncio.to_thread(self.weather.ingest_weather_alerts, region, force_refresh)
+            for region in regions
+        ])
+        
+        # Each port is ingested once, however many routes touch it
+        port_data = dict(zip(port_ids, await asyncio.gather(*[
+            self._ingest_port_data(port_id, force_refresh) for port_id in port_ids
+        ])))
+        
+        timestamp = datetime.now().isoformat()
+        return [
+            self._route_record(route, port_data[route['origin']], port_data[route['destination']], timestamp)
+            for route in routes
+        ]
+    
+    async def _ingest_port_data(self, port_id: str, force_refresh: bool = False) -> Dict:
+        """Ingest traffic, weather and news for one port (sources fetched concurrently)"""
+        traffic, weather, news = await asyncio.gather(
+            asyncio.to_thread(self.port_traffic.ingest_port_traffic, port_id, force_refresh),
+            asyncio.to_thread(self.weather.get_weather_for_port, port_id),
+            asyncio.to_thread(self.news.ingest_news_articles, port_id=port_id, limit=5, force_refresh=force_refresh)
+        )
         
         return {
-            'route_id': route_id,
+            'id': port_id,
+            'traffic': traffic,
+            'weather': weather or {},
+            'news': news
+        }
+    
+    def _route_record(self, route: Dict, origin: Dict, dest: Dict, timestamp: str) -> Dict:
+        """Combine two ports' ingested data into a route data record"""
+        return {
+            'route_id': route['route_id'],
             'route_name': route['name'],
-            'origin_port': {
-                'id': origin_id,
-                'traffic': origin_traffic,
-                'weather': origin_weather or {},
-                'news': origin_news
-            },
-            'destination_port': {
-                'id': dest_id,
-                'traffic': dest_traffic,
-                'weather': dest_weather or {},
-                'news': dest_news
-            },
-            'timestamp': datetime.now().isoformat()
+            'origin_port': dict(origin),
+            'destination_port': dict(dest),
+            'timestamp': timestamp
         }
     
+    def build_route_matrix(self, routes_data: List[Dict]) -> Dict[str, np.ndarray]:
+        """
+        Convert ingested route data to struct-of-arrays form for batch scoring
+        
+        Args:
+            routes_data: Route data dicts from ingest_route_data
+            
+        Returns:
+            Dict of equal-length arrays (one entry per route): 'route_id', and
+            '{origin,dest}_vessels', '_capacity', '_wait_hours', '_severity' per side
+        """
+        matrix = {'route_id': np.array([r['route_id'] for r in routes_data], dtype=object)}
+        
+        for prefix, side in (('origin', 'origin_port'), ('dest', 'destination_port')):
+            traffic = [r[side]['traffic'] for r in routes_data]
+            matrix[f'{prefix}_vessels'] = np.array([t['vessel_count'] for t in traffic], dtype=float)
+            matrix[f'{prefix}_capacity'] = np.array([t['capacity'] for t in traffic], dtype=float)
+            matrix[f'{prefix}_wait_hours'] = np.array([t['wait_time_hours'] for t in traffic], dtype=float)
+            matrix[f'{prefix}_severity'] = np.array(
+                [SEVERITY_LEVELS.get((r[side]['weather'] or {}).get('severity'), 0) for r in routes_data],
+                dtype=np.int8
+            )
+        
+        return matrix
+    
     def get_data_summary(self) -> Dict:
         """Get summary of all stored data"""
+        port_counts = self._count_files(self.data_dir / 'ports', ('_traffic.json', '_history.ndjson'))
+        weather_counts = self._count_files(self.data_dir / 'weather', ('_alerts.json',))
+        alert_counts = self._count_files(self.data_dir / 'weather' / 'alerts', ('.ndjson',))
+        news_counts = self._count_files(self.data_dir / 'news', ('_articles.msgpack',))
+        article_counts = self._count_files(self.data_dir / 'news' / 'articles', ('.jsonl',))
+        
         summary = {
             'data_directory': str(self.data_dir),
             'ports': {
-                'count': len(list((self.data_dir / 'ports').glob('*_traffic.json'))) if (self.data_dir / 'ports').exists() else 0,
-                'history_files': len(list((self.data_dir / 'ports').glob('*_history.json'))) if (self.data_dir / 'ports').exists() else 0
+                'count': port_counts[0],
+                'history_files': port_counts[1]
             },
             'weather': {
-                'alert_files': len(list((self.data_dir / 'weather' / 'alerts').glob('*.json'))) if (self.data_dir / 'weather' / 'alerts').exists() else 0,
-                'cache_files': len(list((self.data_dir / 'weather').glob('*_alerts.json'))) if (self.data_dir / 'weather').exists() else 0
+                'alert_files': alert_counts[0],
+                'cache_files': weather_counts[0]
             },
             'news': {
-                'article_files': len(list((self.data_dir / 'news' / 'articles').glob('*.json'))) if (self.data_dir / 'news' / 'articles').exists() else 0,
-                'cache_files': len(list((self.data_dir / 'news').glob('*_articles.json'))) if (self.data_dir / 'news').exists() else 0
+                'article_files': article_counts[0],
+                'cache_files': news_counts[0]
             }
         }
         
         return summary
     
+    @staticmethod
+    def _count_files(directory: Path, suffixes: Tuple[str, ...]) -> List[int]:
+        """Count files in a directory by name suffix with a single scandir pass"""
+        counts = [0] * len(suffixes)
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            return counts
+        
+        with entries:
+            for entry in entries:
+                name = entry.name
+                for i, suffix in enumerate(suffixes):
+                    if name.endswith(suffix):
+                        counts[i] += 1
+        
+        return counts
+    
     async def continuous_ingestion(self, interval_seconds: int = 300):
         """
         Run continuous data ingestion in background
@@ -154,11 +240,15 @@ class PipelineOrchestrator:
         Args:
             interval_seconds: Interval between ingestion cycles (default 5 minutes)
         """
+        # Schedule against a monotonic clock so slow cycles don't push later ones back
+        next_run = time.monotonic()
         while True:
             try:
-                self.ingest_all_data(force_refresh=True)
-                await asyncio.sleep(interval_seconds)
+                await self.ingest_all_data(force_refresh=True)
+                next_run += interval_seconds
             except Exception as e:
                 print(f"Error in continuous ingestion: {e}")
-                await asyncio.sleep(60)  # Wait 1 minute on error
+                next_run = time.monotonic() + 60  # Wait 1 minute on error
+            
+            await asyncio.sleep(max(0.0, next_run - time.monotonic()))
 
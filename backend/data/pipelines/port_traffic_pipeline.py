@@ -4,14 +4,22 @@ Simulates MarineTraffic/AIS data ingestion
 """
 
 import os
-import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 from pathlib import Path
 import random
 import numpy as np
 
-from backend.data.data_simulator import DataSimulator
+from backend.data.data_simulator import get_simulator
+from backend.data.pipelines import _json
+from backend.ml.time_series_forecaster import HistoryBuffer
+
+
+# History retention and compaction (compaction runs once the file doubles)
+HISTORY_RETENTION_DAYS = 7
+HISTORY_COMPACT_MIN_BYTES = 64 * 1024
 
 
 class PortTrafficPipeline:
@@ -33,8 +41,24 @@ class PortTrafficPipeline:
         self.data_dir = Path(data_dir) / 'ports'
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
-        self.simulator = DataSimulator()
+        self.simulator = get_simulator()
         self.cache_duration = timedelta(minutes=5)  # Cache for 5 minutes
+        
+        # In-process cache in front of the file cache
+        self._mem = _json.TTLCache(self.cache_duration.total_seconds())
+        
+        # port_id -> history file size that triggers the next compaction
+        self._history_compact_at: Dict[str, int] = {}
+        
+        # Ports whose legacy JSON-array history has been checked for conversion
+        self._history_migrated: Set[str] = set()
+        
+        # One lock per port serializes history appends, reads, migration and compaction
+        self._history_locks: Dict[str, threading.Lock] = {}
+        self._history_locks_guard = threading.Lock()
+        
+        # port_id -> in-memory history for forecasting, loaded on first request and appended on update
+        self._history_buffers: Dict[str, HistoryBuffer] = {}
     
     def ingest_port_traffic(self, port_id: str, force_refresh: bool = False) -> Dict:
         """
@@ -47,36 +71,44 @@ class PortTrafficPipeline:
         Returns:
             Port traffic data
         """
+        if not force_refresh:
+            cached = self._mem.get(port_id)
+            if cached is not None:
+                return cached
+        
         cache_file = self.data_dir / f"{port_id}_traffic.json"
         
+        # Freshness comes from the file mtime, so no parse is needed to decide
+        remaining = _json.cache_remaining(cache_file, self.cache_duration.total_seconds())
+        
+        # Load the cache once: serves a hit, or provides historical context on a miss
+        previous_data = self._load_cache(cache_file)
+        
         # Check cache
-        if not force_refresh and cache_file.exists():
-            cache_data = self._load_cache(cache_file)
-            if cache_data and self._is_cache_valid(cache_data):
-                return cache_data['data']
+        if not force_refresh and previous_data and remaining > 0:
+            self._mem.put(port_id, previous_data['data'], remaining)
+            return previous_data['data']
         
         # Generate new data
         traffic_data = self.simulator.generate_port_traffic(port_id)
         
-        # Add historical context (load previous data if exists)
-        if cache_file.exists():
-            previous_data = self._load_cache(cache_file)
-            if previous_data:
-                traffic_data['previous_vessel_count'] = previous_data['data'].get('vessel_count', 0)
-                traffic_data['trend'] = 'increasing' if traffic_data['vessel_count'] > previous_data['data'].get('vessel_count', 0) else 'decreasing'
+        # Add historical context from the previous snapshot
+        if previous_data:
+            previous_vessel_count = previous_data['data'].get('vessel_count', 0)
+            traffic_data['previous_vessel_count'] = previous_vessel_count
+            traffic_data['trend'] = 'increasing' if traffic_data['vessel_count'] > previous_vessel_count else 'decreasing'
         
         # Store in cache
         self._save_cache(cache_file, traffic_data)
+        self._mem.put(port_id, traffic_data)
         
         return traffic_data
     
     def ingest_all_ports(self) -> List[Dict]:
-        """Ingest traffic data for all ports"""
-        all_traffic = []
-        for port in self.simulator.ports:
-            traffic = self.ingest_port_traffic(port['id'])
-            all_traffic.append(traffic)
-        return all_traffic
+        """Ingest traffic data for all ports (cache I/O fanned out across threads)"""
+        port_ids = [port['id'] for port in self.simulator.ports]
+        with ThreadPoolExecutor(max_workers=min(16, len(port_ids))) as executor:
+            return list(executor.map(self.ingest_port_traffic, port_ids))
     
     def get_port_history(self, port_id: str, hours: int = 24) -> List[Dict]:
         """
@@ -89,21 +121,29 @@ class PortTrafficPipeline:
         Returns:
             List of historical traffic snapshots
         """
-        history_file = self.data_dir / f"{port_id}_history.json"
+        cutoff_iso = (datetime.now() - timedelta(hours=hours)).isoformat()
+        with self._history_lock(port_id):
+            history = self._read_history(self._history_file(port_id))
         
-        if history_file.exists():
-            with open(history_file, 'r') as f:
-                history = json.load(f)
+        # Filter by time window (ISO-8601 timestamps sort lexicographically)
+        return [entry for entry in history if entry['timestamp'] >= cutoff_iso]
+    
+    def get_history_buffer(self, port_id: str) -> HistoryBuffer:
+        """
+        Get port history as arrays for TimeSeriesForecaster.forecast_congestion
+        
+        Args:
+            port_id: Port identifier
             
-            # Filter by time window
-            cutoff_time = datetime.now() - timedelta(hours=hours)
-            filtered = [
-                entry for entry in history
-                if datetime.fromisoformat(entry['timestamp']) >= cutoff_time
-            ]
-            return filtered
-        
-        return []
+        Returns:
+            Copy of the port's retained history (the file is parsed only on first request)
+        """
+        with self._history_lock(port_id):
+            buffer = self._history_buffers.get(port_id)
+            if buffer is None:
+                records = self._read_history(self._history_file(port_id))
+                buffer = self._history_buffers[port_id] = HistoryBuffer.from_records(records)
+            return buffer.copy()
     
     def _save_cache(self, cache_file: Path, data: Dict):
         """Save data to cache file"""
@@ -111,49 +151,101 @@ class PortTrafficPipeline:
             'timestamp': datetime.now().isoformat(),
             'data': data
         }
-        with open(cache_file, 'w') as f:
-            json.dump(cache_data, f, indent=2)
+        _json.write_atomic(cache_file, _json.dumps(cache_data))
     
     def _load_cache(self, cache_file: Path) -> Optional[Dict]:
         """Load data from cache file"""
         try:
-            with open(cache_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            return _json.loads(cache_file.read_bytes())
+        except (FileNotFoundError, _json.JSONDecodeError):
             return None
     
-    def _is_cache_valid(self, cache_data: Dict) -> bool:
-        """Check if cache is still valid"""
-        if 'timestamp' not in cache_data:
-            return False
-        
-        cache_time = datetime.fromisoformat(cache_data['timestamp'])
-        return datetime.now() - cache_time < self.cache_duration
-    
     def update_port_history(self, port_id: str, traffic_data: Dict):
-        """Append traffic data to historical record"""
-        history_file = self.data_dir / f"{port_id}_history.json"
-        
-        history = []
-        if history_file.exists():
-            with open(history_file, 'r') as f:
-                history = json.load(f)
-        
-        # Add new entry
-        history.append({
+        """Append traffic data to historical record (NDJSON, one snapshot per line)"""
+        entry = {
             'timestamp': traffic_data.get('timestamp', datetime.now().isoformat()),
             'vessel_count': traffic_data.get('vessel_count', 0),
             'wait_time_hours': traffic_data.get('wait_time_hours', 0),
             'congestion_index': traffic_data.get('congestion_index', 0)
-        })
+        }
+        with self._history_lock(port_id):
+            history_file = self._history_file(port_id)
+            with open(history_file, 'ab') as f:
+                f.write(_json.dumps(entry) + b'\n')
+                size = f.tell()
+            
+            buffer = self._history_buffers.get(port_id)
+            if buffer is not None:
+                buffer.append(entry)
+            
+            # Compact lazily, once the file has doubled since the last compaction
+            if size > self._history_compact_at.get(port_id, HISTORY_COMPACT_MIN_BYTES):
+                size = self._compact_history(history_file)
+                self._history_compact_at[port_id] = max(HISTORY_COMPACT_MIN_BYTES, 2 * size)
+                # Reloaded from the compacted file on next request, dropping expired snapshots
+                self._history_buffers.pop(port_id, None)
+    
+    def _history_lock(self, port_id: str) -> threading.Lock:
+        """Lock guarding a port's history file"""
+        with self._history_locks_guard:
+            lock = self._history_locks.get(port_id)
+            if lock is None:
+                lock = self._history_locks[port_id] = threading.Lock()
+            return lock
+    
+    def _history_file(self, port_id: str) -> Path:
+        """
+        History file for a port, converting the legacy {port}_history.json array on first use
+        (caller holds the port's history lock)
+        """
+        history_file = self.data_dir / f"{port_id}_history.ndjson"
+        if port_id not in self._history_migrated:
+            self._migrate_legacy_history(self.data_dir / f"{port_id}_history.json", history_file)
+            self._history_migrated.add(port_id)
+        return history_file
+    
+    def _migrate_legacy_history(self, legacy_file: Path, history_file: Path):
+        """Prepend the snapshots of a legacy JSON-array history file to the NDJSON history"""
+        try:
+            legacy_history = _json.loads(legacy_file.read_bytes())
+        except FileNotFoundError:
+            return
+        except _json.JSONDecodeError:
+            return  # Leave unreadable files in place
+        
+        payload = b''.join(_json.dumps(entry) + b'\n' for entry in legacy_history)
+        try:
+            payload += history_file.read_bytes()
+        except FileNotFoundError:
+            pass
         
+        # Legacy snapshots predate every NDJSON line, so order is preserved
+        _json.write_atomic(history_file, payload)
+        legacy_file.unlink()
+    
+    def _read_history(self, history_file: Path) -> List[Dict]:
+        """Read all snapshots from a history file"""
+        try:
+            with open(history_file, 'rb') as f:
+                return [_json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+    
+    def _compact_history(self, history_file: Path) -> int:
+        """
+        Drop snapshots older than the retention window (caller holds the port's history lock)
+        
+        Returns:
+            Size in bytes of the compacted file
+        """
         # Keep only last 7 days
-        cutoff_time = datetime.now() - timedelta(days=7)
-        history = [
-            entry for entry in history
-            if datetime.fromisoformat(entry['timestamp']) >= cutoff_time
-        ]
-        
-        with open(history_file, 'w') as f:
-            json.dump(history, f, indent=2)
-
+        cutoff_iso = (datetime.now() - timedelta(days=HISTORY_RETENTION_DAYS)).isoformat()
+        
+        with open(history_file, 'rb') as f:
+            kept = b''.join(
+                line for line in f
+                if line.strip() and _json.loads(line)['timestamp'] >= cutoff_iso
+            )
+        
+        _json.write_atomic(history_file, kept)
+        return len(kept)
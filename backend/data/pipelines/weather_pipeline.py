@@ -4,13 +4,17 @@ Simulates NOAA weather alert ingestion
 """
 
 import os
-import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import random
 
-from backend.data.data_simulator import DataSimulator
+from backend.data.data_simulator import get_simulator
+from backend.data.pipelines import _json
+
+
+# Severity ranking used for threshold filtering and most-severe selection
+SEVERITY_LEVELS = {'light': 1, 'moderate': 2, 'severe': 3, 'extreme': 4}
 
 
 class WeatherPipeline:
@@ -32,8 +36,17 @@ class WeatherPipeline:
         self.data_dir = Path(data_dir) / 'weather'
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
-        self.simulator = DataSimulator()
+        self._alerts_dir = self.data_dir / 'alerts'
+        self._alerts_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.simulator = get_simulator()
         self.cache_duration = timedelta(minutes=10)  # Cache for 10 minutes
+        
+        # In-process cache in front of the file cache
+        self._mem = _json.TTLCache(self.cache_duration.total_seconds())
+        
+        # region -> (alerts list it was computed from, most severe alert)
+        self._region_worst: Dict[str, Tuple[List[Dict], Optional[Dict]]] = {}
     
     def ingest_weather_alerts(self, region: Optional[str] = None, force_refresh: bool = False) -> List[Dict]:
         """
@@ -46,6 +59,12 @@ class WeatherPipeline:
         Returns:
             List of weather alerts
         """
+        mem_key = region or '__all__'
+        if not force_refresh:
+            cached = self._mem.get(mem_key)
+            if cached is not None:
+                return cached
+        
         if region:
             cache_file = self.data_dir / f"{region}_alerts.json"
             regions = [region]
@@ -53,24 +72,23 @@ class WeatherPipeline:
             cache_file = self.data_dir / "all_alerts.json"
             regions = list(self.simulator.weather_zones.keys())
         
-        # Check cache
-        if not force_refresh and cache_file.exists():
-            cache_data = self._load_cache(cache_file)
-            if cache_data and self._is_cache_valid(cache_data):
+        # Check cache (freshness from the file mtime; only fresh files are read)
+        if not force_refresh:
+            remaining = _json.cache_remaining(cache_file, self.cache_duration.total_seconds())
+            cache_data = self._load_cache(cache_file) if remaining > 0 else None
+            if cache_data:
+                self._mem.put(mem_key, cache_data['data'], remaining)
                 return cache_data['data']
         
         # Generate alerts for each region
-        alerts = []
-        for reg in regions:
-            alert = self.simulator.generate_weather_alert(reg)
-            alerts.append(alert)
+        alerts = self.simulator.generate_weather_alerts_batch(regions)
         
         # Store in cache
         self._save_cache(cache_file, alerts)
+        self._mem.put(mem_key, alerts)
         
-        # Store individual alerts
-        for alert in alerts:
-            self._store_alert(alert)
+        # Append alerts to the daily history file
+        self._store_alerts(alerts)
         
         return alerts
     
@@ -84,48 +102,51 @@ class WeatherPipeline:
         Returns:
             List of active alerts
         """
-        severity_levels = {'light': 1, 'moderate': 2, 'severe': 3, 'extreme': 4}
-        threshold_level = severity_levels.get(severity_threshold, 2)
+        threshold_level = SEVERITY_LEVELS.get(severity_threshold, 2)
         
         all_alerts = self.ingest_weather_alerts()
+        now = datetime.now()
         active = []
         
         for alert in all_alerts:
-            alert_level = severity_levels.get(alert['severity'], 0)
+            alert_level = SEVERITY_LEVELS.get(alert['severity'], 0)
             if alert_level >= threshold_level:
                 # Check if alert is still active (within duration)
                 alert_time = datetime.fromisoformat(alert['timestamp'])
                 duration = timedelta(hours=alert.get('duration_hours', 24))
                 
-                if datetime.now() - alert_time < duration:
+                if now - alert_time < duration:
                     active.append(alert)
         
         return active
     
     def get_weather_for_port(self, port_id: str) -> Optional[Dict]:
         """Get weather alert for a specific port"""
-        port = next((p for p in self.simulator.ports if p['id'] == port_id), None)
+        port = self.simulator.get_port(port_id)
         if not port:
             return None
         
         region = port['region']
         alerts = self.ingest_weather_alerts(region)
         
-        # Return most severe alert
-        if alerts:
-            severity_levels = {'light': 1, 'moderate': 2, 'severe': 3, 'extreme': 4}
-            return max(alerts, key=lambda a: severity_levels.get(a['severity'], 0))
+        # Ports in the same region share the answer until the region's alerts change
+        cached = self._region_worst.get(region)
+        if cached and cached[0] is alerts:
+            return cached[1]
         
-        return None
+        # Return most severe alert
+        worst = max(alerts, key=lambda a: SEVERITY_LEVELS.get(a['severity'], 0)) if alerts else None
+        self._region_worst[region] = (alerts, worst)
+        return worst
     
-    def _store_alert(self, alert: Dict):
-        """Store individual alert to history"""
-        alert_id = f"{alert['weather_zone']}_{alert['timestamp']}"
-        alert_file = self.data_dir / f"alerts/{alert_id}.json"
-        alert_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(alert_file, 'w') as f:
-            json.dump(alert, f, indent=2)
+    def _store_alerts(self, alerts: List[Dict]):
+        """Append alerts to history (alerts/YYYY-MM-DD.ndjson, one alert per line)"""
+        if not alerts:
+            return
+        
+        alert_file = self._alerts_dir / f"{datetime.now():%Y-%m-%d}.ndjson"
+        with open(alert_file, 'ab') as f:
+            f.write(b''.join(_json.dumps(alert) + b'\n' for alert in alerts))
     
     def _save_cache(self, cache_file: Path, data: List[Dict]):
         """Save data to cache file"""
@@ -133,22 +154,11 @@ class WeatherPipeline:
             'timestamp': datetime.now().isoformat(),
             'data': data
         }
-        with open(cache_file, 'w') as f:
-            json.dump(cache_data, f, indent=2)
+        _json.write_atomic(cache_file, _json.dumps(cache_data))
     
     def _load_cache(self, cache_file: Path) -> Optional[Dict]:
         """Load data from cache file"""
         try:
-            with open(cache_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            return _json.loads(cache_file.read_bytes())
+        except (FileNotFoundError, _json.JSONDecodeError):
             return None
-    
-    def _is_cache_valid(self, cache_data: Dict) -> bool:
-        """Check if cache is still valid"""
-        if 'timestamp' not in cache_data:
-            return False
-        
-        cache_time = datetime.fromisoformat(cache_data['timestamp'])
-        return datetime.now() - cache_time < self.cache_duration
-
@@ -5,20 +5,45 @@ Main API server that connects ML models with frontend
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from typing import List, Dict, Optional
+from contextlib import asynccontextmanager
 import asyncio
+import bisect
+import time
 from datetime import datetime
 
 from backend.ml.risk_scorer import RiskScorer
 from backend.ml.sentiment_analyzer import SentimentAnalyzer
 from backend.ml.congestion_analyzer import CongestionAnalyzer
 from backend.data.ontology import SupplyChainOntology, Port, Route, RiskLevel
-from backend.data.data_simulator import DataSimulator
+from backend.data.data_simulator import DataSimulator, get_simulator
 from backend.data.pipelines.pipeline_orchestrator import PipelineOrchestrator
 from backend.config import DATA_DIR
 
-app = FastAPI(title="Atlas Sentinel API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build models and warm caches at startup rather than at import"""
+    global data_simulator, risk_scorer, pipeline_orchestrator
+    
+    # Simulator first: the pipelines share its memoized instance
+    data_simulator = await asyncio.to_thread(get_simulator)
+    
+    # Independent initializations run side by side
+    risk_scorer, pipeline_orchestrator, _, _ = await asyncio.gather(
+        asyncio.to_thread(RiskScorer),
+        asyncio.to_thread(PipelineOrchestrator, DATA_DIR),
+        asyncio.to_thread(initialize_ontology),
+        asyncio.to_thread(congestion_analyzer.warmup)
+    )
+    yield
+
+app = FastAPI(
+    title="Atlas Sentinel API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
 
 # CORS middleware
 app.add_middleware(
@@ -29,13 +54,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
-risk_scorer = RiskScorer()
+# Initialize components (model training, simulator and pipelines are set up in lifespan)
 sentiment_analyzer = SentimentAnalyzer()
 congestion_analyzer = CongestionAnalyzer()
 ontology = SupplyChainOntology()
-data_simulator = DataSimulator()
-pipeline_orchestrator = PipelineOrchestrator(data_dir=DATA_DIR)
+data_simulator: Optional[DataSimulator] = None
+risk_scorer: Optional[RiskScorer] = None
+pipeline_orchestrator: Optional[PipelineOrchestrator] = None
 
 # Initialize ontology with sample data
 def initialize_ontology():
@@ -65,13 +90,19 @@ def initialize_ontology():
         )
         ontology.add_route(route)
 
-# Initialize on startup
-initialize_ontology()
+# Route risk assessments are shared by /api/routes, /api/routes/top-risk and /api/alerts
+ROUTES_CACHE_TTL_SECONDS = 30
+_routes_cache = {'generation': -1, 'expires': 0.0, 'routes': None, 'neg_scores': None}
+_routes_lock = asyncio.Lock()
 
-def _weather_severity_value(severity: str) -> int:
-    """Convert weather severity to numeric value for comparison"""
-    severity_map = {'none': 0, 'light': 1, 'moderate': 2, 'severe': 3, 'extreme': 4}
-    return severity_map.get(severity, 0)
+# Weather severity ranking for worst-weather comparisons
+_SEVERITY = {'none': 0, 'light': 1, 'moderate': 2, 'severe': 3, 'extreme': 4}
+
+def _worst_weather(origin_weather: Dict, dest_weather: Dict) -> Dict:
+    """Pick the more severe of two weather alerts (origin wins ties)"""
+    if _SEVERITY.get(origin_weather['severity'], 0) >= _SEVERITY.get(dest_weather['severity'], 0):
+        return origin_weather
+    return dest_weather
 
 @app.get("/")
 async def root():
@@ -91,119 +122,188 @@ async def get_data_summary():
 @app.post("/api/data/refresh")
 async def refresh_data():
     """Force refresh all data caches"""
-    pipeline_orchestrator.ingest_all_data(force_refresh=True)
-    return {"message": "Data refreshed", "timestamp": datetime.now().isoformat()}
+    await pipeline_orchestrator.ingest_all_data(force_refresh=True)
+    return {"message": "Data refreshed", "timestamp": datetime.now()}
 
-@app.get("/api/routes")
-async def get_routes():
-    """Get all routes with current risk assessments"""
+def _route_risk_inputs(route_data: Dict,
+                       article_scores: Dict[int, tuple],
+                       origin_congestion: float,
+                       dest_congestion: float,
+                       timestamp: str) -> tuple:
+    """
+    Combine one route's ingested data into risk scorer inputs
+    
+    Args:
+        route_data: Route data from the pipeline orchestrator
+        article_scores: id(article) -> (sentiment_score, urgency keywords), from score_articles
+        origin_congestion: Congestion index of the origin port
+        dest_congestion: Congestion index of the destination port
+        timestamp: ISO timestamp shared by every assessment in this computation
+        
+    Returns:
+        (worst weather, combined sentiment, bottleneck congestion data)
+    """
+    # Combine the pre-scored sentiment for both ports
+    all_news = route_data['origin_port']['news'] + route_data['destination_port']['news']
+    combined_sentiment = sentiment_analyzer.summarize_scores(
+        [article_scores[id(article)] for article in all_news], timestamp
+    )
+    
+    origin_traffic = route_data['origin_port']['traffic']
+    dest_traffic = route_data['destination_port']['traffic']
+    origin_vessels, dest_vessels = origin_traffic['vessel_count'], dest_traffic['vessel_count']
+    origin_wait, dest_wait = origin_traffic['wait_time_hours'], dest_traffic['wait_time_hours']
+    
+    # Use worst congestion (bottleneck)
+    avg_congestion_data = {
+        'congestion_index': origin_congestion if origin_congestion >= dest_congestion else dest_congestion,
+        'vessel_count': (origin_vessels + dest_vessels) // 2,
+        'wait_time_hours': origin_wait if origin_wait >= dest_wait else dest_wait
+    }
+    
+    # Use worst weather (bottleneck)
+    worst_weather = _worst_weather(route_data['origin_port']['weather'], route_data['destination_port']['weather'])
+    
+    return worst_weather, combined_sentiment, avg_congestion_data
+
+def _route_result(route_data: Dict,
+                  origin_congestion: float,
+                  dest_congestion: float,
+                  worst_weather: Dict,
+                  combined_sentiment: Dict,
+                  avg_congestion_data: Dict,
+                  total_risk: float,
+                  risk_level: str,
+                  components: Dict[str, float]) -> Dict:
+    """Record a route's risk in the ontology and build its API response entry"""
+    route_id = route_data['route_id']
+    ontology.update_route_risk(route_id, total_risk, RiskLevel(risk_level))
+    
+    origin_traffic = route_data['origin_port']['traffic']
+    dest_traffic = route_data['destination_port']['traffic']
+    
+    return {
+        'route_id': route_id,
+        'name': route_data['route_name'],
+        'origin': {
+            'port_id': route_data['origin_port']['id'],
+            'name': ontology.ports[route_data['origin_port']['id']].name,
+            'latitude': origin_traffic['latitude'],
+            'longitude': origin_traffic['longitude'],
+            'congestion': origin_congestion,
+            'vessel_count': origin_traffic['vessel_count']
+        },
+        'destination': {
+            'port_id': route_data['destination_port']['id'],
+            'name': ontology.ports[route_data['destination_port']['id']].name,
+            'latitude': dest_traffic['latitude'],
+            'longitude': dest_traffic['longitude'],
+            'congestion': dest_congestion,
+            'vessel_count': dest_traffic['vessel_count']
+        },
+        'risk_score': total_risk,
+        'risk_level': risk_level,
+        'risk_components': components,
+        'weather': worst_weather,
+        'sentiment': combined_sentiment,
+        'congestion': avg_congestion_data
+    }
+
+async def _get_cached_routes() -> List[Dict]:
+    """Get route assessments sorted by risk, recomputing after TTL expiry or a data refresh"""
+    def is_fresh() -> bool:
+        return (_routes_cache['routes'] is not None
+                and _routes_cache['generation'] == pipeline_orchestrator.generation
+                and time.monotonic() < _routes_cache['expires'])
+    
+    if is_fresh():
+        return _routes_cache['routes']
+    
+    # Single-flight: concurrent requests wait for one recomputation
+    async with _routes_lock:
+        if not is_fresh():
+            generation = pipeline_orchestrator.generation
+            routes = await _compute_routes()
+            _routes_cache.update(
+                generation=generation,
+                expires=time.monotonic() + ROUTES_CACHE_TTL_SECONDS,
+                routes=routes,
+                neg_scores=[-route['risk_score'] for route in routes]  # Ascending, for bisect
+            )
+        return _routes_cache['routes']
+
+async def _compute_routes() -> List[Dict]:
+    """Assess risk for every route (sorted by risk score, highest first)"""
     # Use pipeline orchestrator to ingest data (uses cached data when available)
-    routes_data = []
-    for route in data_simulator.routes:
-        route_data = pipeline_orchestrator.ingest_route_data(route['route_id'])
-        if route_data:
-            routes_data.append(route_data)
+    routes_data = await pipeline_orchestrator.ingest_routes_data(
+        [route['route_id'] for route in data_simulator.routes]
+    )
     
     # Fallback to simulator if pipeline returns empty
     if not routes_data:
         routes_data = data_simulator.generate_all_routes_data()
     
+    # Score every distinct article once (routes share ports, so articles repeat)
+    articles = {
+        id(article): article
+        for route_data in routes_data
+        for side in ('origin_port', 'destination_port')
+        for article in route_data[side]['news']
+    }
+    article_scores = dict(zip(articles, sentiment_analyzer.score_articles(list(articles.values()))))
+    
+    # Congestion for every origin and destination port, vectorized over the route matrix
+    matrix = pipeline_orchestrator.build_route_matrix(routes_data)
+    origin_congestion = congestion_analyzer.compute_congestion_index_batch(
+        matrix['origin_vessels'], matrix['origin_capacity'], matrix['origin_wait_hours']
+    ).tolist()
+    dest_congestion = congestion_analyzer.compute_congestion_index_batch(
+        matrix['dest_vessels'], matrix['dest_capacity'], matrix['dest_wait_hours']
+    ).tolist()
+    
+    timestamp = datetime.now().isoformat()
+    inputs = [
+        _route_risk_inputs(route_data, article_scores, *congestion, timestamp)
+        for route_data, *congestion in zip(routes_data, origin_congestion, dest_congestion)
+    ]
+    weather, sentiment, congestion = zip(*inputs) if inputs else ((), (), ())
+    
+    # Score every route in one batch call, off the event loop (model inference is CPU-bound)
+    batch = await asyncio.to_thread(
+        risk_scorer.compute_route_risk_batch,
+        [route_data['route_id'] for route_data in routes_data],
+        list(weather), list(sentiment), list(congestion),
+        timestamp=timestamp
+    )
+    
+    # Component dicts are only assembled here, for the response
+    names = list(batch['components'])
+    component_rows = zip(*(batch['components'][name].tolist() for name in names))
     results = []
-    for route_data in routes_data:
-        route_id = route_data['route_id']
-        
-        # Analyze sentiment for both ports
-        origin_news = route_data['origin_port']['news']
-        dest_news = route_data['destination_port']['news']
-        all_news = origin_news + dest_news
-        
-        origin_sentiment = sentiment_analyzer.analyze_articles(origin_news)
-        dest_sentiment = sentiment_analyzer.analyze_articles(dest_news)
-        combined_sentiment = sentiment_analyzer.analyze_articles(all_news)
-        
-        # Analyze congestion for both ports
-        origin_traffic = route_data['origin_port']['traffic']
-        dest_traffic = route_data['destination_port']['traffic']
-        
-        origin_congestion = congestion_analyzer.compute_congestion_index(
-            origin_traffic['vessel_count'],
-            origin_traffic['capacity'],
-            origin_traffic['wait_time_hours']
-        )
-        dest_congestion = congestion_analyzer.compute_congestion_index(
-            dest_traffic['vessel_count'],
-            dest_traffic['capacity'],
-            dest_traffic['wait_time_hours']
-        )
-        
-        # Use worst congestion (bottleneck)
-        max_congestion = max(origin_congestion, dest_congestion)
-        avg_congestion_data = {
-            'congestion_index': max_congestion,
-            'vessel_count': (origin_traffic['vessel_count'] + dest_traffic['vessel_count']) // 2,
-            'wait_time_hours': max(origin_traffic['wait_time_hours'], dest_traffic['wait_time_hours'])
-        }
-        
-        # Use worst weather (bottleneck)
-        origin_weather = route_data['origin_port']['weather']
-        dest_weather = route_data['destination_port']['weather']
-        worst_weather = origin_weather if (
-            _weather_severity_value(origin_weather['severity']) >= 
-            _weather_severity_value(dest_weather['severity'])
-        ) else dest_weather
-        
-        # Compute risk
-        risk_assessment = risk_scorer.compute_route_risk(
-            route_id=route_id,
-            weather_data=worst_weather,
-            sentiment_data=combined_sentiment,
-            congestion_data=avg_congestion_data
-        )
-        
-        # Update ontology
-        risk_level = RiskLevel(risk_assessment['risk_level'])
-        ontology.update_route_risk(route_id, risk_assessment['total_risk'], risk_level)
-        
-        # Get route from ontology
-        route = ontology.routes.get(route_id)
-        
-        results.append({
-            'route_id': route_id,
-            'name': route_data['route_name'],
-            'origin': {
-                'port_id': route_data['origin_port']['id'],
-                'name': next(p['name'] for p in data_simulator.ports if p['id'] == route_data['origin_port']['id']),
-                'latitude': origin_traffic['latitude'],
-                'longitude': origin_traffic['longitude'],
-                'congestion': origin_congestion,
-                'vessel_count': origin_traffic['vessel_count']
-            },
-            'destination': {
-                'port_id': route_data['destination_port']['id'],
-                'name': next(p['name'] for p in data_simulator.ports if p['id'] == route_data['destination_port']['id']),
-                'latitude': dest_traffic['latitude'],
-                'longitude': dest_traffic['longitude'],
-                'congestion': dest_congestion,
-                'vessel_count': dest_traffic['vessel_count']
-            },
-            'risk_score': risk_assessment['total_risk'],
-            'risk_level': risk_assessment['risk_level'],
-            'risk_components': risk_assessment['components'],
-            'weather': worst_weather,
-            'sentiment': combined_sentiment,
-            'congestion': avg_congestion_data
-        })
+    for i, (total_risk, risk_level, components) in enumerate(
+            zip(batch['total_risk'].tolist(), batch['risk_level'], component_rows)):
+        results.append(_route_result(
+            routes_data[i], origin_congestion[i], dest_congestion[i], *inputs[i],
+            total_risk, risk_level, dict(zip(names, components))
+        ))
     
     # Sort by risk score
     results.sort(key=lambda x: x['risk_score'], reverse=True)
     
-    return {"routes": results, "timestamp": datetime.now().isoformat()}
+    return results
+
+@app.get("/api/routes")
+async def get_routes():
+    """Get all routes with current risk assessments"""
+    routes = await _get_cached_routes()
+    # Returned directly so the large payload goes straight to orjson (no jsonable_encoder pass)
+    return ORJSONResponse({"routes": routes, "timestamp": datetime.now()})
 
 @app.get("/api/routes/top-risk")
 async def get_top_risk_routes(limit: int = 10):
     """Get top N at-risk routes"""
-    routes_response = await get_routes()
-    top_routes = routes_response['routes'][:limit]
+    # Copy so delay predictions don't leak into the shared route cache
+    top_routes = [dict(route) for route in (await _get_cached_routes())[:limit]]
     
     # Add predicted delays
     risk_assessments = [
@@ -227,26 +327,34 @@ async def get_top_risk_routes(limit: int = 10):
     return {
         "routes": top_routes,
         "limit": limit,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now()
     }
 
+def _get_port_traffic(port_id: str) -> Dict:
+    """Get current traffic for one port"""
+    # Use pipeline to get port traffic (uses cache)
+    traffic = pipeline_orchestrator.port_traffic.ingest_port_traffic(port_id)
+    if not traffic:
+        # Fallback to simulator
+        traffic = data_simulator.generate_port_traffic(port_id)
+    return traffic
+
 @app.get("/api/ports")
 async def get_ports():
     """Get all ports with current metrics"""
-    ports_data = []
+    port_ids = list(ontology.ports.keys())
+    traffic = await asyncio.gather(*[
+        asyncio.to_thread(_get_port_traffic, port_id) for port_id in port_ids
+    ])
     
-    for port_id in ontology.ports.keys():
-        # Use pipeline to get port traffic (uses cache)
-        traffic = pipeline_orchestrator.port_traffic.ingest_port_traffic(port_id)
-        if not traffic:
-            # Fallback to simulator
-            traffic = data_simulator.generate_port_traffic(port_id)
-        congestion_metrics = congestion_analyzer.compute_congestion_index(
-            traffic['vessel_count'],
-            traffic['capacity'],
-            traffic['wait_time_hours']
-        )
-        
+    congestion = congestion_analyzer.compute_congestion_index_batch(
+        [t['vessel_count'] for t in traffic],
+        [t['capacity'] for t in traffic],
+        [t['wait_time_hours'] for t in traffic]
+    ).tolist()
+    
+    ports_data = []
+    for port_id, port_traffic, congestion_metrics in zip(port_ids, traffic, congestion):
         port = ontology.ports[port_id]
         ports_data.append({
             'port_id': port_id,
@@ -255,64 +363,63 @@ async def get_ports():
             'latitude': port.latitude,
             'longitude': port.longitude,
             'region': port.region,
-            'vessel_count': traffic['vessel_count'],
-            'capacity': traffic['capacity'],
-            'wait_time_hours': traffic['wait_time_hours'],
+            'vessel_count': port_traffic['vessel_count'],
+            'capacity': port_traffic['capacity'],
+            'wait_time_hours': port_traffic['wait_time_hours'],
             'congestion_index': congestion_metrics
         })
     
-    return {"ports": ports_data, "timestamp": datetime.now().isoformat()}
+    return {"ports": ports_data, "timestamp": datetime.now()}
 
 @app.get("/api/route/{route_id}")
 async def get_route_details(route_id: str):
     """Get detailed information for a specific route"""
+    now = datetime.now()
+    timestamp = now.isoformat()
+    
     # Use pipeline orchestrator to get route data
-    route_data = pipeline_orchestrator.ingest_route_data(route_id)
+    route_data = await pipeline_orchestrator.ingest_route_data(route_id)
     if not route_data:
         # Fallback to simulator
         route_data = data_simulator.generate_route_data(route_id)
     
-    # Full analysis
-    origin_sentiment = sentiment_analyzer.analyze_articles(route_data['origin_port']['news'])
-    dest_sentiment = sentiment_analyzer.analyze_articles(route_data['destination_port']['news'])
+    # Full analysis (each article scored once, then aggregated per port and per route)
+    origin_scores = sentiment_analyzer.score_articles(route_data['origin_port']['news'])
+    dest_scores = sentiment_analyzer.score_articles(route_data['destination_port']['news'])
+    origin_sentiment = sentiment_analyzer.summarize_scores(origin_scores, timestamp)
+    dest_sentiment = sentiment_analyzer.summarize_scores(dest_scores, timestamp)
+    
+    origin_traffic = route_data['origin_port']['traffic']
+    dest_traffic = route_data['destination_port']['traffic']
+    origin_vessels, dest_vessels = origin_traffic['vessel_count'], dest_traffic['vessel_count']
+    origin_wait, dest_wait = origin_traffic['wait_time_hours'], dest_traffic['wait_time_hours']
     
     origin_congestion = congestion_analyzer.compute_congestion_index(
-        route_data['origin_port']['traffic']['vessel_count'],
-        route_data['origin_port']['traffic']['capacity'],
-        route_data['origin_port']['traffic']['wait_time_hours']
+        origin_vessels, origin_traffic['capacity'], origin_wait
     )
     dest_congestion = congestion_analyzer.compute_congestion_index(
-        route_data['destination_port']['traffic']['vessel_count'],
-        route_data['destination_port']['traffic']['capacity'],
-        route_data['destination_port']['traffic']['wait_time_hours']
+        dest_vessels, dest_traffic['capacity'], dest_wait
     )
     
-    combined_sentiment = sentiment_analyzer.analyze_articles(
-        route_data['origin_port']['news'] + route_data['destination_port']['news']
-    )
+    combined_sentiment = sentiment_analyzer.summarize_scores(origin_scores + dest_scores, timestamp)
     
-    worst_weather = route_data['origin_port']['weather'] if (
-        _weather_severity_value(route_data['origin_port']['weather']['severity']) >=
-        _weather_severity_value(route_data['destination_port']['weather']['severity'])
-    ) else route_data['destination_port']['weather']
+    worst_weather = _worst_weather(
+        route_data['origin_port']['weather'],
+        route_data['destination_port']['weather']
+    )
     
     max_congestion_data = {
-        'congestion_index': max(origin_congestion, dest_congestion),
-        'vessel_count': max(
-            route_data['origin_port']['traffic']['vessel_count'],
-            route_data['destination_port']['traffic']['vessel_count']
-        ),
-        'wait_time_hours': max(
-            route_data['origin_port']['traffic']['wait_time_hours'],
-            route_data['destination_port']['traffic']['wait_time_hours']
-        )
+        'congestion_index': origin_congestion if origin_congestion >= dest_congestion else dest_congestion,
+        'vessel_count': origin_vessels if origin_vessels >= dest_vessels else dest_vessels,
+        'wait_time_hours': origin_wait if origin_wait >= dest_wait else dest_wait
     }
     
     risk_assessment = risk_scorer.compute_route_risk(
         route_id=route_id,
         weather_data=worst_weather,
         sentiment_data=combined_sentiment,
-        congestion_data=max_congestion_data
+        congestion_data=max_congestion_data,
+        timestamp=timestamp
     )
     
     return {
@@ -320,37 +427,37 @@ async def get_route_details(route_id: str):
         "route_name": route_data['route_name'],
         "risk_assessment": risk_assessment,
         "origin_port": {
-            "data": route_data['origin_port']['traffic'],
+            "data": origin_traffic,
             "sentiment": origin_sentiment,
             "congestion": origin_congestion,
             "weather": route_data['origin_port']['weather'],
             "news": route_data['origin_port']['news']
         },
         "destination_port": {
-            "data": route_data['destination_port']['traffic'],
+            "data": dest_traffic,
             "sentiment": dest_sentiment,
             "congestion": dest_congestion,
             "weather": route_data['destination_port']['weather'],
             "news": route_data['destination_port']['news']
         },
-        "timestamp": datetime.now().isoformat()
+        "timestamp": now
     }
 
 @app.get("/api/alerts")
 async def get_alerts(threshold: float = 0.7):
     """Get active alerts (routes with risk above threshold)"""
-    routes_response = await get_routes()
-    alerts = [
-        route for route in routes_response['routes']
-        if route['risk_score'] >= threshold
-    ]
+    routes = await _get_cached_routes()
     
-    return {
+    # Routes are sorted by risk (highest first), so alerts are the prefix at or above threshold
+    cut = bisect.bisect_right(_routes_cache['neg_scores'], -threshold)
+    alerts = routes[:cut]
+    
+    return ORJSONResponse({
         "alerts": alerts,
         "count": len(alerts),
         "threshold": threshold,
-        "timestamp": datetime.now().isoformat()
-    }
+        "timestamp": datetime.now()
+    })
 
 if __name__ == "__main__":
     import uvicorn
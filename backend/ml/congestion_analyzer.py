@@ -4,10 +4,41 @@ Computes rolling congestion indices from port traffic data
 """
 
 import numpy as np
-import pandas as pd
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; batches fall back to the NumPy kernel
+    njit = None
+
+
+# Historical term of the congestion index when no history is known (factor 0.5 * weight 0.2)
+NEUTRAL_HISTORICAL_TERM = 0.5 * 0.2
+
+
+def _congestion_loop(vessels, capacity, wait, hist):
+    """Fused per-port congestion loop (compiled with numba; NaN or 0 in hist = unknown)"""
+    out = np.empty(vessels.shape[0])
+    for i in range(vessels.shape[0]):
+        capacity_util = min(1.0, vessels[i] / capacity[i]) if capacity[i] > 0 else 0.0
+        wait_factor = min(1.0, wait[i] / 72.0)
+        
+        h = hist[i]
+        if h != h or h == 0:
+            congestion_index = capacity_util * 0.4 + wait_factor * 0.4 + NEUTRAL_HISTORICAL_TERM
+        else:
+            deviation = (wait[i] - h) / max(h, 1.0)
+            historical_factor = min(1.0, max(0.0, 0.5 + deviation * 0.5))
+            congestion_index = capacity_util * 0.4 + wait_factor * 0.4 + historical_factor * 0.2
+        
+        out[i] = min(1.0, max(0.0, congestion_index))
+    return out
+
+
+# No fastmath: it would let the compiler assume away the NaN check above
+_congestion_kernel = njit(cache=True)(_congestion_loop) if njit is not None else None
+
 
 class CongestionAnalyzer:
     """
@@ -24,6 +55,10 @@ class CongestionAnalyzer:
         """
         self.window_hours = window_hours
     
+    def warmup(self):
+        """Compile the batch congestion kernel ahead of the first request (no-op without numba)"""
+        self.compute_congestion_index_batch(np.zeros(1), np.ones(1), np.zeros(1), np.full(1, np.nan))
+    
     def compute_congestion_index(self, 
                                  current_vessels: int,
                                  capacity: int,
@@ -36,7 +71,7 @@ class CongestionAnalyzer:
             current_vessels: Number of vessels currently at port
             capacity: Port capacity (max vessels)
             wait_time_hours: Average wait time in hours
-            historical_avg: Historical average wait time
+            historical_avg: Historical average wait time (None, 0 or NaN = unknown)
             
         Returns:
             Congestion index between 0 and 1
@@ -48,12 +83,14 @@ class CongestionAnalyzer:
         # Normal wait time: 12 hours, severe: 72+ hours
         wait_factor = min(1.0, wait_time_hours / 72.0)
         
+        # Without history the historical term is a constant (neutral factor 0.5 * weight 0.2)
+        if not historical_avg or historical_avg != historical_avg:
+            congestion_index = capacity_util * 0.4 + wait_factor * 0.4 + NEUTRAL_HISTORICAL_TERM
+            return min(1.0, max(0.0, congestion_index))
+        
         # Historical comparison
-        if historical_avg:
-            deviation = (wait_time_hours - historical_avg) / max(historical_avg, 1.0)
-            historical_factor = min(1.0, max(0.0, 0.5 + deviation * 0.5))
-        else:
-            historical_factor = 0.5
+        deviation = (wait_time_hours - historical_avg) / max(historical_avg, 1.0)
+        historical_factor = min(1.0, max(0.0, 0.5 + deviation * 0.5))
         
         # Weighted combination
         congestion_index = (
@@ -64,6 +101,65 @@ class CongestionAnalyzer:
         
         return min(1.0, max(0.0, congestion_index))
     
+    def compute_congestion_index_batch(self,
+                                       current_vessels,
+                                       capacity,
+                                       wait_time_hours,
+                                       historical_avg=None) -> np.ndarray:
+        """
+        Compute congestion indices for many ports at once (vectorized compute_congestion_index)
+        
+        Args:
+            current_vessels: Vessel counts, one per port
+            capacity: Port capacities
+            wait_time_hours: Average wait times in hours
+            historical_avg: Optional historical average wait times (0 or NaN = unknown)
+            
+        Returns:
+            Array of congestion indices between 0 and 1
+        """
+        vessels = np.ascontiguousarray(current_vessels, dtype=np.float64)
+        capacity = np.ascontiguousarray(capacity, dtype=np.float64)
+        wait = np.ascontiguousarray(wait_time_hours, dtype=np.float64)
+        
+        # Compiled single pass when numba is available
+        if _congestion_kernel is not None:
+            if historical_avg is None:
+                hist = np.full(vessels.shape[0], np.nan)
+            else:
+                hist = np.ascontiguousarray(historical_avg, dtype=np.float64)
+            return _congestion_kernel(vessels, capacity, wait, hist)
+        
+        # Capacity utilization (0-1), 0 where capacity is unknown
+        capacity_util = np.minimum(
+            1.0, np.divide(vessels, capacity, out=np.zeros_like(vessels), where=capacity > 0)
+        )
+        
+        # Wait time factor
+        wait_factor = np.minimum(1.0, wait / 72.0)
+        
+        # Without history the historical term is a constant, no per-port work needed
+        if historical_avg is None:
+            return np.clip(capacity_util * 0.4 + wait_factor * 0.4 + NEUTRAL_HISTORICAL_TERM, 0.0, 1.0)
+        
+        # Historical comparison, selected branchlessly where history is known
+        hist = np.asarray(historical_avg, dtype=float)
+        deviation = (wait - hist) / np.maximum(hist, 1.0)
+        historical_factor = np.where(
+            ~np.isnan(hist) & (hist != 0),
+            np.clip(0.5 + deviation * 0.5, 0.0, 1.0),
+            0.5
+        )
+        
+        # Weighted combination
+        congestion_index = (
+            capacity_util * 0.4 +
+            wait_factor * 0.4 +
+            historical_factor * 0.2
+        )
+        
+        return np.clip(congestion_index, 0.0, 1.0)
+    
     def compute_rolling_index(self, 
                               port_id: str,
                               traffic_data: List[Dict]) -> Dict:
@@ -78,6 +174,46 @@ class CongestionAnalyzer:
             Current congestion metrics
         """
         if not traffic_data:
+            return self.compute_rolling_index_arrays(port_id, np.array([], dtype='datetime64[us]'), [], [])
+        
+        # Columnar view of the snapshots
+        n = len(traffic_data)
+        timestamps = np.array([entry['timestamp'] for entry in traffic_data], dtype='datetime64[us]')
+        vessel_counts = np.fromiter((entry['vessel_count'] for entry in traffic_data), dtype=float, count=n)
+        wait_times = np.fromiter((entry['wait_time_hours'] for entry in traffic_data), dtype=float, count=n)
+        capacities = np.fromiter((entry.get('capacity', 100) for entry in traffic_data), dtype=float, count=n)
+        
+        # History is appended in time order, so only reorder when it actually is out of order
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, vessel_counts = timestamps[order], vessel_counts[order]
+            wait_times, capacities = wait_times[order], capacities[order]
+        
+        return self.compute_rolling_index_arrays(
+            port_id, timestamps, vessel_counts, wait_times, capacities
+        )
+    
+    def compute_rolling_index_arrays(self,
+                                     port_id: str,
+                                     timestamps: np.ndarray,
+                                     vessel_counts: np.ndarray,
+                                     wait_times: np.ndarray,
+                                     capacities: Optional[np.ndarray] = None) -> Dict:
+        """
+        Compute rolling congestion index from columnar time series data
+        
+        Args:
+            port_id: Port identifier
+            timestamps: Snapshot times as datetime64, sorted ascending
+            vessel_counts: Vessel count per snapshot
+            wait_times: Wait time in hours per snapshot
+            capacities: Port capacity per snapshot (defaults to 100)
+            
+        Returns:
+            Current congestion metrics
+        """
+        n = len(timestamps)
+        if n == 0:
             return {
                 'port_id': port_id,
                 'congestion_index': 0.0,
@@ -86,40 +222,40 @@ class CongestionAnalyzer:
                 'trend': 'stable'
             }
         
-        # Convert to DataFrame for easier analysis
-        df = pd.DataFrame(traffic_data)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp')
+        vessel_counts = np.asarray(vessel_counts, dtype=float)
+        wait_times = np.asarray(wait_times, dtype=float)
         
         # Get most recent data
         now = datetime.now()
         window_start = now - timedelta(hours=self.window_hours)
-        recent_data = df[df['timestamp'] >= window_start]
+        start = int(np.searchsorted(timestamps, np.datetime64(window_start, 'us'), side='left'))
         
-        if recent_data.empty:
-            recent_data = df.tail(1)
+        if start < n:
+            recent = slice(start, n)
+            historical = slice(0, start)
+        else:
+            # No data in the window: fall back to the latest snapshot, everything counts as history
+            recent = slice(n - 1, n)
+            historical = slice(0, n if n > 1 else 0)
         
-        latest = recent_data.iloc[-1]
+        recent_wait = wait_times[recent]
         
         # Compute metrics
-        avg_vessels = recent_data['vessel_count'].mean()
-        avg_wait = recent_data['wait_time_hours'].mean()
-        capacity = latest.get('capacity', 100)  # Default capacity
+        avg_vessels = vessel_counts[recent].mean()
+        avg_wait = recent_wait.mean()
+        capacity = float(capacities[-1]) if capacities is not None else 100  # Default capacity
         
         # Historical average (from older data)
-        historical_avg = None
-        if len(df) > len(recent_data):
-            historical_data = df[df['timestamp'] < window_start]
-            if not historical_data.empty:
-                historical_avg = historical_data['wait_time_hours'].mean()
+        historical_wait = wait_times[historical]
+        historical_avg = historical_wait.mean() if len(historical_wait) else None
         
         congestion_index = self.compute_congestion_index(
             avg_vessels, capacity, avg_wait, historical_avg
         )
         
         # Compute trend
-        if len(recent_data) >= 2:
-            recent_trend = recent_data['wait_time_hours'].iloc[-1] - recent_data['wait_time_hours'].iloc[0]
+        if len(recent_wait) >= 2:
+            recent_trend = recent_wait[-1] - recent_wait[0]
             if recent_trend > 2:
                 trend = 'increasing'
             elif recent_trend < -2:
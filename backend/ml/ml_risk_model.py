@@ -4,16 +4,334 @@ Uses ensemble models (Random Forest + Gradient Boosting) for risk classification
 """
 
 import numpy as np
-import pandas as pd
 from typing import Dict, List, Optional, Tuple
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, VotingRegressor
+from sklearn.ensemble import (
+    RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor, VotingRegressor
+)
+from sklearn.inspection import permutation_importance
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
 import joblib
 import os
+import threading
+import zlib
+from functools import lru_cache
 from pathlib import Path
 import pickle
 
+from backend.config import get_setting
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; compiled ensembles fall back to the NumPy traversal
+    njit = None
+
+
+# Max distinct feature vectors kept in the prediction cache
+PREDICTION_CACHE_SIZE = 4096
+
+# Rows of synthetic features used to check the compiled evaluator against sklearn
+COMPILED_PROBE_ROWS = 64
+
+# Held-out synthetic sample for permutation importance (seeded apart from the training data)
+IMPORTANCE_SAMPLE_ROWS = 500
+IMPORTANCE_SEED = 7
+
+# Risk levels indexed by the number of configured thresholds (medium, high) a score reaches
+RISK_LEVELS = ('low', 'medium', 'high')
+
+
+# Levels of each tree stored in heap order for branchless traversal
+TOP_LEVELS_DEPTH = 6
+
+
+def _tree_nodes(tree) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Node arrays (left, right, feature, threshold, value) of a fitted sklearn decision tree"""
+    tree_ = tree.tree_
+    return (tree_.children_left.astype(np.int64), tree_.children_right.astype(np.int64),
+            tree_.feature.astype(np.int64), tree_.threshold, tree_.value[:, 0, 0])
+
+
+def _hist_predictor_nodes(predictor) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Node arrays (left, right, feature, threshold, value) of a HistGradientBoosting tree predictor"""
+    nodes = predictor.nodes
+    is_leaf = nodes['is_leaf'].astype(bool)
+    return (np.where(is_leaf, -1, nodes['left'].astype(np.int64)),
+            np.where(is_leaf, -1, nodes['right'].astype(np.int64)),
+            nodes['feature_idx'].astype(np.int64), nodes['num_threshold'], nodes['value'])
+
+
+def _flatten_tree(children_left: np.ndarray,
+                  children_right: np.ndarray,
+                  feature: np.ndarray,
+                  threshold: np.ndarray,
+                  depth: int = TOP_LEVELS_DEPTH) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Lay out the top levels of a fitted tree as a complete binary tree in heap order
+    
+    Node k's children are 2k+1 (left) and 2k+2 (right). Where the real tree ends
+    above `depth`, dummy nodes with an +inf threshold always send rows left, so
+    every row takes exactly `depth` steps.
+    
+    Args:
+        children_left: Left child of each node (-1 for leaves)
+        children_right: Right child of each node (-1 for leaves)
+        feature: Split feature of each node
+        threshold: Split threshold of each node (rows with x <= threshold go left)
+        depth: Number of levels to flatten
+        
+    Returns:
+        (feature, threshold) of the 2**depth - 1 heap nodes, and the tree node id
+        reached at each of the 2**depth exits (where pointer traversal resumes)
+    """
+    n_top = 2 ** depth - 1
+    top_feature = np.zeros(n_top, dtype=np.int64)
+    top_threshold = np.full(n_top, np.inf)
+    top_exit = np.zeros(n_top + 1, dtype=np.int64)
+    
+    stack = [(0, 0, 0)]  # (heap position, tree node, level)
+    while stack:
+        position, node, level = stack.pop()
+        if level == depth:
+            top_exit[position - n_top] = node
+            continue
+        if children_left[node] == -1:
+            # Leaf above the cut: dummy node, both subtrees lead back to the leaf
+            stack.append((2 * position + 1, node, level + 1))
+            stack.append((2 * position + 2, node, level + 1))
+        else:
+            top_feature[position] = feature[node]
+            top_threshold[position] = threshold[node]
+            stack.append((2 * position + 1, children_left[node], level + 1))
+            stack.append((2 * position + 2, children_right[node], level + 1))
+    
+    return top_feature, top_threshold, top_exit
+
+
+def _float32_floor(values: np.ndarray) -> np.ndarray:
+    """
+    Round thresholds down to float32
+    
+    For any float32 x, x <= t holds exactly when x <= the largest float32 not
+    above t, so float32 features split the same way against either threshold.
+    """
+    narrowed = values.astype(np.float32)
+    rounded_up = narrowed > values
+    narrowed[rounded_up] = np.nextafter(narrowed[rounded_up], np.float32(-np.inf))
+    return narrowed
+
+
+def _forest_loop(X, top_feature, top_threshold, top_exit, left, right, feature, threshold, value, start):
+    """Sum of leaf values over all trees per row, starting from `start` (compiled with numba)"""
+    n_top = top_feature.shape[1]
+    out = np.empty(X.shape[0])
+    for i in range(X.shape[0]):
+        total = start
+        for t in range(top_feature.shape[0]):
+            # Branchless walk over the heap-ordered top levels
+            idx = 0
+            while idx < n_top:
+                idx = 2 * idx + 1 + (X[i, top_feature[t, idx]] > top_threshold[t, idx])
+            
+            # Pointer traversal for the rest of the tree
+            node = top_exit[t, idx - n_top]
+            while left[node] != -1:
+                if X[i, feature[node]] <= threshold[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            total += value[node]
+        out[i] = total
+    return out
+
+
+def _forest_numpy(X, top_feature, top_threshold, top_exit, left, right, feature, threshold, value, start):
+    """NumPy fallback for _forest_loop: walks every tree one level at a time"""
+    n_trees, n_top = top_feature.shape
+    trees = np.arange(n_trees)
+    out = np.empty(X.shape[0])
+    for i in range(X.shape[0]):
+        idx = np.zeros(n_trees, dtype=np.int64)
+        while idx[0] < n_top:  # All trees share the same heap depth
+            idx = 2 * idx + 1 + (X[i, top_feature[trees, idx]] > top_threshold[trees, idx])
+        nodes = top_exit[trees, idx - n_top]
+        
+        internal = left[nodes] != -1
+        while internal.any():
+            active = nodes[internal]
+            go_left = X[i, feature[active]] <= threshold[active]
+            nodes[internal] = np.where(go_left, left[active], right[active])
+            internal = left[nodes] != -1
+        total = start
+        for leaf_value in value[nodes].tolist():  # Tree order, same summation as _forest_loop
+            total += leaf_value
+        out[i] = total
+    return out
+
+
+_forest_kernel = njit(cache=True, nogil=True)(_forest_loop) if njit is not None else _forest_numpy
+
+
+# Divisor applied to each raw feature column by _featurize (1.0 leaves the column as is)
+_FEATURE_DIVISORS = np.array([
+    1.0, 1.0, 72.0, 90.0, 180.0,    # weather: severity, type, duration, latitude, longitude
+    1.0, 10.0, 5.0, 10.0,           # sentiment: score, articles, urgency keywords, score count
+    1.0, 72.0, 50.0, 1.0, 1.0,      # congestion: index, wait hours, vessels, utilization, trend
+    1.0, 3.0, 72.0,                 # historical: disruption rate, recent disruptions, avg delay
+    1.0, 1.0                        # route hash features
+])
+
+# Raw feature columns capped at 1.0 after division
+_FEATURE_CAPPED = np.array([
+    False, False, False, False, False,
+    False, True, True, False,
+    False, True, True, False, False,
+    False, True, False,
+    False, False
+])
+
+
+def _featurize_loop(raw, divisors, capped):
+    """Normalize raw feature rows in one pass (compiled with numba)"""
+    out = np.empty_like(raw)
+    for i in range(raw.shape[0]):
+        for j in range(raw.shape[1]):
+            value = raw[i, j] / divisors[j]
+            out[i, j] = min(1.0, value) if capped[j] else value
+    return out
+
+
+def _featurize_numpy(raw, divisors, capped):
+    """NumPy fallback for _featurize_loop"""
+    out = raw / divisors
+    out[:, capped] = np.minimum(1.0, out[:, capped])
+    return out
+
+
+_featurize = njit(cache=True)(_featurize_loop) if njit is not None else _featurize_numpy
+
+
+@lru_cache(maxsize=1024)
+def _route_hash_features(port_id: str) -> Tuple[float, float]:
+    """Hash-based route features for a port id (CRC32, so stable across processes)"""
+    route_hash = zlib.crc32(port_id.encode()) % 100
+    return route_hash / 100.0, (route_hash % 10) / 10.0
+
+
+class _CompiledForest:
+    """
+    Flat-array evaluator for a fitted tree ensemble
+    
+    The top levels of every tree are stored in heap order (see _flatten_tree);
+    the remaining nodes are concatenated into shared arrays (child indices made
+    global, -1 marks a leaf). Prediction is a single compiled traversal loop
+    instead of one Python-dispatched predict per tree.
+    """
+    
+    def __init__(self, trees: List[Tuple[np.ndarray, ...]], scale: float = 1.0, start: float = 0.0,
+                 divisor: float = 1.0, depth: int = TOP_LEVELS_DEPTH, float32: bool = True):
+        """
+        Flatten fitted trees
+        
+        Args:
+            trees: Node arrays (left, right, feature, threshold, value) per tree
+            scale: Factor applied to every leaf value (GB learning rate)
+            start: Initial value of each row's sum (GB init prediction)
+            divisor: Divisor applied to the final sum (tree count for RF averaging)
+            depth: Number of top levels per tree in the heap layout
+            float32: Compare features in float32 (sklearn decision trees) rather than
+                float64 (HistGradientBoosting predictors)
+        """
+        top_feature, top_threshold, top_exit = [], [], []
+        left, right, feature, threshold, value = [], [], [], [], []
+        offset = 0
+        for children_left, children_right, tree_feature, tree_threshold, tree_value in trees:
+            heap_feature, heap_threshold, heap_exit = _flatten_tree(
+                children_left, children_right, tree_feature, tree_threshold, depth
+            )
+            top_feature.append(heap_feature)
+            top_threshold.append(heap_threshold)
+            top_exit.append(heap_exit + offset)
+            
+            left.append(np.where(children_left == -1, -1, children_left + offset))
+            right.append(np.where(children_right == -1, -1, children_right + offset))
+            feature.append(tree_feature)
+            threshold.append(tree_threshold)
+            value.append(scale * tree_value)
+            offset += len(children_left)
+        
+        # Narrow node fields (int16 features, int32 links, float32 thresholds) for denser nodes
+        narrow_threshold = _float32_floor if float32 else np.asarray
+        self.top_feature = np.stack(top_feature).astype(np.int16)
+        self.top_threshold = narrow_threshold(np.stack(top_threshold))
+        self.top_exit = np.stack(top_exit).astype(np.int32)
+        self.left = np.concatenate(left).astype(np.int32)
+        self.right = np.concatenate(right).astype(np.int32)
+        self.feature = np.concatenate(feature).astype(np.int16)
+        self.threshold = narrow_threshold(np.concatenate(threshold))
+        self.value = np.concatenate(value)
+        self.start = float(start)
+        self.divisor = float(divisor)
+        self.dtype = np.float32 if float32 else np.float64
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict for a 2-D feature array (compared at the same precision as the sklearn model)"""
+        X = np.ascontiguousarray(X, dtype=self.dtype)
+        out = _forest_kernel(X, self.top_feature, self.top_threshold, self.top_exit,
+                             self.left, self.right, self.feature, self.threshold,
+                             self.value, self.start)
+        return out / self.divisor if self.divisor != 1.0 else out
+
+
+class _CompiledEnsemble:
+    """Compiled replacement for VotingRegressor([('rf', ...), ('gb', ...)]).predict"""
+    
+    def __init__(self, model: VotingRegressor):
+        """
+        Compile both sub-estimators of the fitted voting ensemble
+        
+        Args:
+            model: Fitted VotingRegressor with 'rf' and 'gb' estimators
+        """
+        rf = model.named_estimators_['rf']
+        gb = model.named_estimators_['gb']
+        n_features = gb.n_features_in_
+        
+        self.rf = _CompiledForest([_tree_nodes(tree) for tree in rf.estimators_], divisor=len(rf.estimators_))
+        if isinstance(gb, HistGradientBoostingRegressor):
+            # Leaf values already include the learning rate; sums start at the baseline
+            self.gb = _CompiledForest(
+                [_hist_predictor_nodes(predictors[0]) for predictors in gb._predictors],
+                start=float(gb._baseline_prediction[0, 0]), float32=False
+            )
+        else:
+            gb_init = float(gb.init_.predict(np.zeros((1, n_features)))[0])
+            self.gb = _CompiledForest([_tree_nodes(tree) for tree in gb.estimators_[:, 0]],
+                                      scale=gb.learning_rate, start=gb_init)
+        self.n_features = n_features
+    
+    @classmethod
+    def from_model(cls, model) -> Optional['_CompiledEnsemble']:
+        """Compile a model if it is the RF + GB voting ensemble (None otherwise)"""
+        if not isinstance(model, VotingRegressor):
+            return None
+        estimators = getattr(model, 'named_estimators_', {})
+        gb = estimators.get('gb')
+        if isinstance(gb, HistGradientBoostingRegressor):
+            # Plain numeric splits with an identity link only
+            gb_supported = gb.is_categorical_ is None and gb.loss == 'squared_error'
+        else:
+            gb_supported = isinstance(gb, GradientBoostingRegressor) and gb.init_ not in (None, 'zero')
+        if not (isinstance(estimators.get('rf'), RandomForestRegressor)
+                and gb_supported
+                and getattr(model, 'weights', None) is None):
+            return None
+        return cls(model)
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Average of the RF and GB predictions, as VotingRegressor does"""
+        return (self.rf.predict(X) + self.gb.predict(X)) / 2
+
 
 class MLRiskModel:
     """
@@ -21,6 +339,9 @@ class MLRiskModel:
     Uses ensemble of Random Forest and Gradient Boosting
     """
     
+    # Serializes initial training so concurrent constructors don't each train (and save) a model
+    _train_lock = threading.Lock()
+    
     def __init__(self, model_dir: Optional[str] = None):
         """
         Initialize ML risk model
@@ -35,16 +356,31 @@ class MLRiskModel:
         self.model_dir.mkdir(parents=True, exist_ok=True)
         
         self.model = None
-        self.scaler = StandardScaler()
+        self._compiled: Optional[_CompiledEnsemble] = None  # Native evaluator for self.model
+        self.scaler: Optional[StandardScaler] = None  # Only set for models saved by older versions
         self.label_encoders = {}
         self.is_trained = False
         
+        # Feature vector -> predicted risk (predictions are deterministic for a given model)
+        self._prediction_cache: Dict[tuple, float] = {}
+        
+        # Permutation importances of the ensemble members, computed on first request
+        self._importance: Optional[np.ndarray] = None
+        
         # Try to load existing model
         self._load_model()
         
         # If no model exists, train on synthetic data
+        self._ensure_trained()
+    
+    def _ensure_trained(self):
+        """Train on synthetic data unless a model is loaded (or another instance saved one meanwhile)"""
         if not self.is_trained:
-            self._train_on_synthetic_data()
+            with MLRiskModel._train_lock:
+                # Another instance may have trained and saved a model while we waited
+                self._load_model()
+                if not self.is_trained:
+                    self._train_on_synthetic_data()
     
     def _extract_features(self, 
                          weather_data: Dict,
@@ -63,116 +399,149 @@ class MLRiskModel:
         Returns:
             Feature vector as numpy array
         """
-        features = []
+        return self._extract_features_batch(
+            [weather_data], [sentiment_data], [congestion_data], [historical_data]
+        )
+    
+    def _extract_features_batch(self,
+                                weather_list: List[Dict],
+                                sentiment_list: List[Dict],
+                                congestion_list: List[Dict],
+                                historical_list: Optional[List[Optional[Dict]]] = None) -> np.ndarray:
+        """
+        Extract features for many samples at once
         
+        Args:
+            weather_list: Weather information per sample
+            sentiment_list: News sentiment information per sample
+            congestion_list: Port congestion information per sample
+            historical_list: Optional historical data per sample
+            
+        Returns:
+            Feature matrix of shape (n_samples, 19)
+        """
+        if historical_list is None:
+            historical_list = [None] * len(weather_list)
+        
+        # Dict lookups and categorical codes in Python, numeric normalization in one kernel call
+        rows = [
+            self._raw_feature_row(weather, sentiment, congestion, history)
+            for weather, sentiment, congestion, history
+            in zip(weather_list, sentiment_list, congestion_list, historical_list)
+        ]
+        raw = np.array(rows, dtype=float).reshape(len(rows), 19)
+        return _featurize(raw, _FEATURE_DIVISORS, _FEATURE_CAPPED)
+    
+    def _raw_feature_row(self,
+                         weather_data: Dict,
+                         sentiment_data: Dict,
+                         congestion_data: Dict,
+                         historical_data: Optional[Dict] = None) -> List[float]:
+        """
+        Look up one sample's 19 raw feature values (normalized afterwards by _featurize)
+        """
         # Weather features (5 features)
         severity_map = {'none': 0, 'light': 1, 'moderate': 2, 'severe': 3, 'extreme': 4}
-        features.append(severity_map.get(weather_data.get('severity', 'none'), 0))
-        
         weather_type_map = {
             'hurricane': 4, 'typhoon': 4, 'storm': 3, 'wind': 2, 
             'fog': 1, 'ice': 2, 'none': 0
         }
-        features.append(weather_type_map.get(weather_data.get('type', 'none'), 0))
-        features.append(weather_data.get('duration_hours', 0) / 72.0)  # Normalized
-        
-        # Weather location features
-        features.append(weather_data.get('latitude', 0) / 90.0)  # Normalized
-        features.append(weather_data.get('longitude', 0) / 180.0)  # Normalized
-        
-        # Sentiment features (4 features)
-        features.append(sentiment_data.get('sentiment_score', 0))  # Already -1 to 1
-        features.append(min(1.0, sentiment_data.get('article_count', 0) / 10.0))  # Normalized
-        features.append(min(1.0, sentiment_data.get('urgency_keywords', 0) / 5.0))  # Normalized
-        features.append(len(sentiment_data.get('individual_scores', [])) / 10.0)  # Normalized
-        
-        # Congestion features (5 features)
-        features.append(congestion_data.get('congestion_index', 0))
-        features.append(min(1.0, congestion_data.get('wait_time_hours', 0) / 72.0))
-        features.append(min(1.0, congestion_data.get('vessel_count', 0) / 50.0))
-        features.append(congestion_data.get('capacity_utilization', 0))
-        features.append(1.0 if congestion_data.get('trend') == 'increasing' else 0.0)
+        features = [
+            severity_map.get(weather_data.get('severity', 'none'), 0),
+            weather_type_map.get(weather_data.get('type', 'none'), 0),
+            weather_data.get('duration_hours', 0),
+            weather_data.get('latitude', 0),
+            weather_data.get('longitude', 0),
+            
+            # Sentiment features (4 features)
+            sentiment_data.get('sentiment_score', 0),  # Already -1 to 1
+            sentiment_data.get('article_count', 0),
+            sentiment_data.get('urgency_keywords', 0),
+            len(sentiment_data.get('individual_scores', [])),
+            
+            # Congestion features (5 features)
+            congestion_data.get('congestion_index', 0),
+            congestion_data.get('wait_time_hours', 0),
+            congestion_data.get('vessel_count', 0),
+            congestion_data.get('capacity_utilization', 0),
+            1.0 if congestion_data.get('trend') == 'increasing' else 0.0
+        ]
         
         # Historical features (3 features)
         if historical_data:
             features.append(historical_data.get('disruption_rate', 0))
-            features.append(min(1.0, historical_data.get('recent_disruptions', 0) / 3.0))
-            features.append(historical_data.get('avg_delay_hours', 0) / 72.0)
+            features.append(historical_data.get('recent_disruptions', 0))
+            features.append(historical_data.get('avg_delay_hours', 0))
         else:
             features.extend([0.0, 0.0, 0.0])
         
         # Route features (2 features) - would need route_id mapping
         # For now, use hash-based features
-        route_hash = hash(str(weather_data.get('affected_port_id', ''))) % 100
-        features.append(route_hash / 100.0)
-        features.append((route_hash % 10) / 10.0)
+        features.extend(_route_hash_features(str(weather_data.get('affected_port_id', ''))))
         
-        return np.array(features).reshape(1, -1)
+        return features
     
-    def _generate_synthetic_training_data(self, n_samples: int = 1000) -> Tuple[np.ndarray, np.ndarray]:
+    def _generate_synthetic_training_data(self, n_samples: int = 1000,
+                                          seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
         """
         Generate synthetic training data for model training
         
         Args:
             n_samples: Number of training samples
+            seed: Random seed (the default reproduces the training data)
             
         Returns:
             X (features), y (target risk scores)
         """
-        np.random.seed(42)
-        X = []
-        y = []
-        
-        for _ in range(n_samples):
-            # Generate synthetic features
-            weather_severity = np.random.choice([0, 1, 2, 3, 4], p=[0.2, 0.3, 0.3, 0.15, 0.05])
-            weather_type = np.random.choice([0, 1, 2, 3, 4], p=[0.1, 0.2, 0.3, 0.3, 0.1])
-            weather_duration = np.random.uniform(0, 1)
-            lat = np.random.uniform(-1, 1)
-            lon = np.random.uniform(-1, 1)
-            
-            sentiment = np.random.uniform(-1, 1)
-            article_count = np.random.uniform(0, 1)
-            urgency = np.random.uniform(0, 1)
-            score_count = np.random.uniform(0, 1)
-            
-            congestion_idx = np.random.uniform(0, 1)
-            wait_time = np.random.uniform(0, 1)
-            vessel_count = np.random.uniform(0, 1)
-            capacity_util = np.random.uniform(0, 1)
-            trend = np.random.choice([0, 1])
-            
-            disruption_rate = np.random.uniform(0, 1)
-            recent_disruptions = np.random.uniform(0, 1)
-            avg_delay = np.random.uniform(0, 1)
-            
-            route_hash1 = np.random.uniform(0, 1)
-            route_hash2 = np.random.uniform(0, 1)
-            
-            features = np.array([
-                weather_severity, weather_type, weather_duration, lat, lon,
-                sentiment, article_count, urgency, score_count,
-                congestion_idx, wait_time, vessel_count, capacity_util, trend,
-                disruption_rate, recent_disruptions, avg_delay,
-                route_hash1, route_hash2
-            ])
-            
-            # Generate target (risk score) based on features with some noise
-            risk = (
-                weather_severity * 0.15 +
-                (1 - sentiment) / 2 * 0.25 +  # Negative sentiment = risk
-                congestion_idx * 0.20 +
-                wait_time * 0.15 +
-                disruption_rate * 0.10 +
-                urgency * 0.10 +
-                np.random.normal(0, 0.1)  # Noise
-            )
-            risk = np.clip(risk, 0, 1)
-            
-            X.append(features)
-            y.append(risk)
+        rng = np.random.default_rng(seed)
+        n = n_samples
+        
+        # Draw each feature column for all samples at once
+        weather_severity = rng.choice(5, size=n, p=[0.2, 0.3, 0.3, 0.15, 0.05])
+        weather_type = rng.choice(5, size=n, p=[0.1, 0.2, 0.3, 0.3, 0.1])
+        weather_duration = rng.uniform(0, 1, size=n)
+        lat = rng.uniform(-1, 1, size=n)
+        lon = rng.uniform(-1, 1, size=n)
+        
+        sentiment = rng.uniform(-1, 1, size=n)
+        article_count = rng.uniform(0, 1, size=n)
+        urgency = rng.uniform(0, 1, size=n)
+        score_count = rng.uniform(0, 1, size=n)
+        
+        congestion_idx = rng.uniform(0, 1, size=n)
+        wait_time = rng.uniform(0, 1, size=n)
+        vessel_count = rng.uniform(0, 1, size=n)
+        capacity_util = rng.uniform(0, 1, size=n)
+        trend = rng.choice(2, size=n)
+        
+        disruption_rate = rng.uniform(0, 1, size=n)
+        recent_disruptions = rng.uniform(0, 1, size=n)
+        avg_delay = rng.uniform(0, 1, size=n)
+        
+        route_hash1 = rng.uniform(0, 1, size=n)
+        route_hash2 = rng.uniform(0, 1, size=n)
+        
+        X = np.column_stack([
+            weather_severity, weather_type, weather_duration, lat, lon,
+            sentiment, article_count, urgency, score_count,
+            congestion_idx, wait_time, vessel_count, capacity_util, trend,
+            disruption_rate, recent_disruptions, avg_delay,
+            route_hash1, route_hash2
+        ]).astype(float)
+        
+        # Generate target (risk score) based on features with some noise
+        y = (
+            weather_severity * 0.15 +
+            (1 - sentiment) / 2 * 0.25 +  # Negative sentiment = risk
+            congestion_idx * 0.20 +
+            wait_time * 0.15 +
+            disruption_rate * 0.10 +
+            urgency * 0.10 +
+            rng.normal(0, 0.1, size=n)  # Noise
+        )
+        y = np.clip(y, 0, 1)
         
-        return np.array(X), np.array(y)
+        return X, y
     
     def _train_on_synthetic_data(self):
         """Train model on synthetic data"""
@@ -185,9 +554,8 @@ class MLRiskModel:
             X, y, test_size=0.2, random_state=42
         )
         
-        # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        # No feature scaling: tree splits are invariant to it
+        self.scaler = None
         
         # Create ensemble model
         rf = RandomForestRegressor(
@@ -198,8 +566,8 @@ class MLRiskModel:
             n_jobs=-1
         )
         
-        gb = GradientBoostingRegressor(
-            n_estimators=100,
+        gb = HistGradientBoostingRegressor(
+            max_iter=100,
             max_depth=5,
             learning_rate=0.1,
             random_state=42
@@ -211,15 +579,18 @@ class MLRiskModel:
         ])
         
         # Train
-        self.model.fit(X_train_scaled, y_train)
+        self.model.fit(X_train, y_train)
         
         # Evaluate
-        train_score = self.model.score(X_train_scaled, y_train)
-        test_score = self.model.score(X_test_scaled, y_test)
+        train_score = self.model.score(X_train, y_train)
+        test_score = self.model.score(X_test, y_test)
         
         print(f"Model trained - Train R²: {train_score:.3f}, Test R²: {test_score:.3f}")
         
         self.is_trained = True
+        self._prediction_cache.clear()
+        self._importance = None
+        self._compile_model()
         self._save_model()
     
     def predict_risk(self,
@@ -239,22 +610,67 @@ class MLRiskModel:
         Returns:
             Predicted risk score (0-1)
         """
-        if not self.is_trained:
-            self._train_on_synthetic_data()
+        return float(self.predict_risk_batch(
+            [weather_data], [sentiment_data], [congestion_data], [historical_data]
+        )[0])
+    
+    def predict_risk_batch(self,
+                           weather_list: List[Dict],
+                           sentiment_list: List[Dict],
+                           congestion_list: List[Dict],
+                           historical_list: Optional[List[Optional[Dict]]] = None) -> np.ndarray:
+        """
+        Predict risk scores for many samples with one model call
+        
+        Args:
+            weather_list: Weather information per sample
+            sentiment_list: News sentiment information per sample
+            congestion_list: Port congestion information per sample
+            historical_list: Optional historical data per sample
+            
+        Returns:
+            Array of predicted risk scores (0-1), one per sample
+        """
+        self._ensure_trained()
         
         # Extract features
-        features = self._extract_features(
-            weather_data, sentiment_data, congestion_data, historical_data
+        features = self._extract_features_batch(
+            weather_list, sentiment_list, congestion_list, historical_list
         )
         
-        # Scale features
-        features_scaled = self.scaler.transform(features)
-        
-        # Predict
-        risk_score = self.model.predict(features_scaled)[0]
+        # Unchanged inputs between data refreshes skip the ensemble entirely
+        keys = [tuple(row) for row in features.tolist()]
+        risk_scores = np.empty(len(keys))
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self._prediction_cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                risk_scores[i] = cached
+        
+        if missing:
+            features_missing = features[missing]
+            if self.scaler is not None:
+                # Models saved by older versions were trained on scaled features
+                features_missing = self.scaler.transform(features_missing)
+            
+            # Predict (compiled trees when available, sklearn otherwise)
+            if self._compiled is not None:
+                predicted = self._compiled.predict(features_missing)
+            else:
+                predicted = self.model.predict(features_missing)
+            
+            # Clip to [0, 1]
+            predicted = np.clip(predicted, 0.0, 1.0)
+            risk_scores[missing] = predicted
+            
+            if len(self._prediction_cache) + len(missing) > PREDICTION_CACHE_SIZE:
+                self._prediction_cache.clear()
+            for i, risk_score in zip(missing, predicted.tolist()):
+                self._prediction_cache[keys[i]] = risk_score
         
-        # Clip to [0, 1]
-        return float(np.clip(risk_score, 0.0, 1.0))
+        return risk_scores
     
     def predict_risk_level(self, risk_score: float) -> str:
         """
@@ -266,12 +682,8 @@ class MLRiskModel:
         Returns:
             Risk level: 'low', 'medium', or 'high'
         """
-        if risk_score >= 0.7:
-            return 'high'
-        elif risk_score >= 0.4:
-            return 'medium'
-        else:
-            return 'low'
+        medium, high = get_setting('MEDIUM_RISK_THRESHOLD'), get_setting('HIGH_RISK_THRESHOLD')
+        return RISK_LEVELS[int(risk_score >= medium) + int(risk_score >= high)]
     
     def get_feature_importance(self) -> Dict[str, float]:
         """
@@ -292,39 +704,92 @@ class MLRiskModel:
         ]
         
         # Get average importance from both models
-        rf_importance = self.model.named_estimators_['rf'].feature_importances_
-        gb_importance = self.model.named_estimators_['gb'].feature_importances_
-        avg_importance = (rf_importance + gb_importance) / 2
+        return dict(zip(feature_names, self._ensemble_importance()))
+    
+    def _ensemble_importance(self) -> np.ndarray:
+        """
+        Average permutation importance of the ensemble members (normalized to sum to 1)
         
-        return dict(zip(feature_names, avg_importance))
+        HistGradientBoostingRegressor has no impurity-based feature_importances_, so both
+        members are measured the same way, on a held-out synthetic sample drawn
+        independently of the training data (computed once per model).
+        """
+        if self._importance is None:
+            X, y = self._generate_synthetic_training_data(
+                n_samples=IMPORTANCE_SAMPLE_ROWS, seed=IMPORTANCE_SEED
+            )
+            if self.scaler is not None:
+                X = self.scaler.transform(X)
+            
+            per_model = []
+            for name in ('rf', 'gb'):
+                result = permutation_importance(
+                    self.model.named_estimators_[name], X, y, n_repeats=5, random_state=42
+                )
+                importance = np.clip(result.importances_mean, 0.0, None)
+                total = importance.sum()
+                per_model.append(importance / total if total > 0 else importance)
+            self._importance = np.mean(per_model, axis=0)
+        return self._importance
+    
+    def _compile_model(self):
+        """Build the compiled evaluator for the current model (and compile its kernels now)"""
+        _featurize(np.zeros((1, 19)), _FEATURE_DIVISORS, _FEATURE_CAPPED)
+        self._compiled = _CompiledEnsemble.from_model(self.model)
+        if self._compiled is None:
+            return
+        
+        # The evaluator reads sklearn's fitted internals; if their layout ever changes,
+        # fall back to sklearn rather than serve wrong scores
+        probe, _ = self._generate_synthetic_training_data(n_samples=COMPILED_PROBE_ROWS)
+        if self.scaler is not None:
+            probe = self.scaler.transform(probe)
+        if not np.allclose(self._compiled.predict(probe), self.model.predict(probe), rtol=0, atol=1e-9):
+            print("Compiled risk model disagrees with sklearn; using sklearn predictions")
+            self._compiled = None
     
     def _save_model(self):
-        """Save trained model to disk"""
-        model_path = self.model_dir / 'risk_model.pkl'
-        scaler_path = self.model_dir / 'scaler.pkl'
-        
-        with open(model_path, 'wb') as f:
-            pickle.dump(self.model, f)
-        
-        with open(scaler_path, 'wb') as f:
-            pickle.dump(self.scaler, f)
+        """Save trained model to disk (uncompressed joblib, so arrays can be memory-mapped on load)"""
+        scaler_path = self.model_dir / 'scaler.joblib'
+        if self.scaler is None:
+            # Remove a stale scaler first so it can never be paired with the new model
+            scaler_path.unlink(missing_ok=True)
+        else:
+            joblib.dump(self.scaler, scaler_path)
+        joblib.dump(self.model, self.model_dir / 'risk_model.joblib')
     
     def _load_model(self):
-        """Load trained model from disk"""
-        model_path = self.model_dir / 'risk_model.pkl'
-        scaler_path = self.model_dir / 'scaler.pkl'
-        
-        if model_path.exists() and scaler_path.exists():
-            try:
-                with open(model_path, 'rb') as f:
+        """Load trained model from disk (joblib files, or pickles saved by older versions)"""
+        model_path = self.model_dir / 'risk_model.joblib'
+        scaler_path = self.model_dir / 'scaler.joblib'
+        legacy_model_path = self.model_dir / 'risk_model.pkl'
+        legacy_scaler_path = self.model_dir / 'scaler.pkl'
+        
+        try:
+            if model_path.exists():
+                # Memory-map the numpy arrays instead of copying them onto the heap
+                self.model = joblib.load(model_path, mmap_mode='r')
+                self.scaler = joblib.load(scaler_path, mmap_mode='r') if scaler_path.exists() else None
+            elif legacy_model_path.exists() and legacy_scaler_path.exists():
+                with open(legacy_model_path, 'rb') as f:
                     self.model = pickle.load(f)
                 
-                with open(scaler_path, 'rb') as f:
+                with open(legacy_scaler_path, 'rb') as f:
                     self.scaler = pickle.load(f)
-                
-                self.is_trained = True
-                print("Loaded existing ML risk model")
-            except Exception as e:
-                print(f"Error loading model: {e}")
-                self.is_trained = False
+            else:
+                return
+            
+            self.is_trained = True
+            self._prediction_cache.clear()
+            self._importance = None
+            self._compile_model()
+            print("Loaded existing ML risk model")
+        except Exception as e:
+            print(f"Error loading model: {e}")
+            self.is_trained = False
+
 
+@lru_cache(maxsize=None)
+def get_model(model_dir: Optional[str] = None) -> MLRiskModel:
+    """Get the shared (read-only) ML risk model for a model directory, loaded once per process"""
+    return MLRiskModel(model_dir)
@@ -4,14 +4,50 @@ Uses ML models for risk prediction and combines multiple data modalities
 """
 
 import numpy as np
+from functools import lru_cache
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-import pandas as pd
 
-from backend.ml.ml_risk_model import MLRiskModel
+from backend.config import get_setting
+from backend.ml.ml_risk_model import RISK_LEVELS, get_model
 from backend.ml.time_series_forecaster import TimeSeriesForecaster
 
 
+# Base weather risk by alert severity
+WEATHER_SEVERITY_RISK = {
+    'none': 0.0,
+    'light': 0.2,
+    'moderate': 0.5,
+    'severe': 0.8,
+    'extreme': 1.0
+}
+
+# Weather risk multiplier by alert type
+WEATHER_TYPE_MULTIPLIERS = {
+    'hurricane': 1.2,
+    'typhoon': 1.2,
+    'storm': 1.0,
+    'fog': 0.6,
+    'ice': 0.8,
+    'wind': 0.7
+}
+
+
+@lru_cache(maxsize=4096)
+def _weather_risk(severity: str, weather_type: str, duration_hours: float) -> float:
+    """Weather risk for one (severity, type, duration) combination (memoized; alerts repeat)"""
+    base_risk = WEATHER_SEVERITY_RISK.get(severity, 0.0)
+    
+    # Adjust for weather type
+    multiplier = WEATHER_TYPE_MULTIPLIERS.get(weather_type, 1.0)
+    
+    # Duration factor (longer = higher risk)
+    duration_factor = min(1.0, duration_hours / 48.0)  # Cap at 48 hours
+    
+    risk = base_risk * multiplier * (0.7 + 0.3 * duration_factor)
+    return min(1.0, risk)
+
+
 class RiskScorer:
     """
     Multi-modal risk scoring engine that combines:
@@ -49,14 +85,19 @@ class RiskScorer:
         self.congestion_weight /= total
         self.historical_weight /= total
         
-        # Risk thresholds
-        self.high_risk_threshold = 0.7
-        self.medium_risk_threshold = 0.4
+        # Weight vector in component order (weather, sentiment, congestion, historical) for batch scoring
+        self._weights = np.array([
+            self.weather_weight, self.sentiment_weight, self.congestion_weight, self.historical_weight
+        ])
+        
+        # Risk thresholds (shared with MLRiskModel.predict_risk_level)
+        self.high_risk_threshold = get_setting('HIGH_RISK_THRESHOLD')
+        self.medium_risk_threshold = get_setting('MEDIUM_RISK_THRESHOLD')
         
         # Initialize ML models
         self.use_ml = use_ml
         if use_ml:
-            self.ml_model = MLRiskModel()
+            self.ml_model = get_model()
             self.forecaster = TimeSeriesForecaster()
         else:
             self.ml_model = None
@@ -72,33 +113,11 @@ class RiskScorer:
         Returns:
             Risk score between 0 and 1
         """
-        severity_map = {
-            'none': 0.0,
-            'light': 0.2,
-            'moderate': 0.5,
-            'severe': 0.8,
-            'extreme': 1.0
-        }
-        
-        base_risk = severity_map.get(weather_data.get('severity', 'none'), 0.0)
-        
-        # Adjust for weather type
-        type_multipliers = {
-            'hurricane': 1.2,
-            'typhoon': 1.2,
-            'storm': 1.0,
-            'fog': 0.6,
-            'ice': 0.8,
-            'wind': 0.7
-        }
-        multiplier = type_multipliers.get(weather_data.get('type', 'storm'), 1.0)
-        
-        # Duration factor (longer = higher risk)
-        duration_hours = weather_data.get('duration_hours', 0)
-        duration_factor = min(1.0, duration_hours / 48.0)  # Cap at 48 hours
-        
-        risk = base_risk * multiplier * (0.7 + 0.3 * duration_factor)
-        return min(1.0, risk)
+        return _weather_risk(
+            weather_data.get('severity', 'none'),
+            weather_data.get('type', 'storm'),
+            weather_data.get('duration_hours', 0)
+        )
     
     def compute_sentiment_risk(self, sentiment_data: Dict) -> float:
         """
@@ -181,7 +200,8 @@ class RiskScorer:
                           weather_data: Dict,
                           sentiment_data: Dict,
                           congestion_data: Dict,
-                          historical_data: Optional[Dict] = None) -> Dict:
+                          historical_data: Optional[Dict] = None,
+                          timestamp: Optional[str] = None) -> Dict:
         """
         Compute comprehensive risk score for a route
         
@@ -191,6 +211,7 @@ class RiskScorer:
             sentiment_data: News sentiment information
             congestion_data: Port congestion information
             historical_data: Optional historical data
+            timestamp: ISO timestamp to stamp the result with (defaults to now)
             
         Returns:
             Dict with risk score and component breakdown
@@ -206,7 +227,6 @@ class RiskScorer:
             total_risk = self.ml_model.predict_risk(
                 weather_data, sentiment_data, congestion_data, historical_data
             )
-            risk_level = self.ml_model.predict_risk_level(total_risk)
         else:
             # Fallback to weighted combination
             total_risk = (
@@ -215,14 +235,11 @@ class RiskScorer:
                 congestion_risk * self.congestion_weight +
                 historical_risk * self.historical_weight
             )
-            
-            # Determine risk level
-            if total_risk >= self.high_risk_threshold:
-                risk_level = 'high'
-            elif total_risk >= self.medium_risk_threshold:
-                risk_level = 'medium'
-            else:
-                risk_level = 'low'
+        
+        # Determine risk level (same cut-offs as the batch path)
+        risk_level = RISK_LEVELS[
+            int(total_risk >= self.medium_risk_threshold) + int(total_risk >= self.high_risk_threshold)
+        ]
         
         return {
             'route_id': route_id,
@@ -240,7 +257,147 @@ class RiskScorer:
                 'congestion': self.congestion_weight,
                 'historical': self.historical_weight
             },
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp or datetime.now().isoformat()
+        }
+    
+    def compute_route_risk_batch(self,
+                                 route_ids: List[str],
+                                 weather_data: List[Dict],
+                                 sentiment_data: List[Dict],
+                                 congestion_data: List[Dict],
+                                 historical_data: Optional[List[Optional[Dict]]] = None,
+                                 timestamp: Optional[str] = None) -> Dict:
+        """
+        Compute risk scores for many routes in one pass
+        
+        Same scoring as compute_route_risk, with the component formulas evaluated
+        as array operations over all routes instead of once per route.
+        
+        Args:
+            route_ids: Route identifiers
+            weather_data: Weather information per route (parallel to route_ids)
+            sentiment_data: News sentiment information per route
+            congestion_data: Port congestion information per route
+            historical_data: Optional historical data per route
+            timestamp: ISO timestamp to stamp the result with (defaults to now)
+            
+        Returns:
+            Dict of parallel results: 'route_ids', 'total_risk' (array),
+            'risk_level' (list), 'components' (name -> array), plus 'weights' and 'timestamp'
+        """
+        if historical_data is None:
+            historical_data = [None] * len(route_ids)
+        
+        components = self.compute_risk_components(
+            self._risk_columns(weather_data, sentiment_data, congestion_data, historical_data)
+        )
+        
+        if self.use_ml and self.ml_model:
+            total_risk = self.ml_model.predict_risk_batch(
+                weather_data, sentiment_data, congestion_data, historical_data
+            )
+        else:
+            # (N, 4) component matrix times the weight vector: one matrix-vector product
+            total_risk = np.column_stack([
+                components['weather'], components['sentiment'],
+                components['congestion'], components['historical']
+            ]) @ self._weights
+        
+        # Index into RISK_LEVELS = number of thresholds reached (side='right' makes them inclusive)
+        level_index = np.searchsorted(
+            [self.medium_risk_threshold, self.high_risk_threshold], total_risk, side='right'
+        )
+        risk_level = [RISK_LEVELS[i] for i in level_index.tolist()]
+        
+        return {
+            'route_ids': list(route_ids),
+            'total_risk': total_risk,
+            'risk_level': risk_level,
+            'components': components,
+            'weights': {
+                'weather': self.weather_weight,
+                'sentiment': self.sentiment_weight,
+                'congestion': self.congestion_weight,
+                'historical': self.historical_weight
+            },
+            'timestamp': timestamp or datetime.now().isoformat()
+        }
+    
+    def compute_risk_components(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Compute the four risk components for many routes from column arrays
+        
+        Vectorized equivalent of compute_weather_risk, compute_sentiment_risk,
+        compute_congestion_risk and compute_historical_risk.
+        
+        Args:
+            columns: One array per input field, all of length N: 'severity' and 'type'
+                (strings), 'duration_hours', 'sentiment_score', 'article_count',
+                'urgency_keywords', 'congestion_index', 'wait_time_hours', 'vessel_count',
+                'disruption_rate', 'recent_disruptions' and 'has_history' (bool)
+                
+        Returns:
+            Dict mapping 'weather', 'sentiment', 'congestion', 'historical' to arrays of risk (0-1)
+        """
+        base_risk = np.array([WEATHER_SEVERITY_RISK.get(severity, 0.0) for severity in columns['severity']],
+                             dtype=float)
+        multiplier = np.array([WEATHER_TYPE_MULTIPLIERS.get(kind, 1.0) for kind in columns['type']], dtype=float)
+        duration_factor = np.minimum(1.0, columns['duration_hours'] / 48.0)
+        weather_risk = np.minimum(1.0, base_risk * multiplier * (0.7 + 0.3 * duration_factor))
+        
+        volume_factor = np.minimum(1.0, columns['article_count'] / 10.0)
+        urgency_factor = np.minimum(1.0, columns['urgency_keywords'] / 5.0)
+        sentiment_risk = np.minimum(
+            1.0, (1.0 - columns['sentiment_score']) / 2.0 * (0.6 + 0.2 * volume_factor + 0.2 * urgency_factor)
+        )
+        
+        wait_factor = np.minimum(1.0, columns['wait_time_hours'] / 72.0)
+        capacity_factor = np.minimum(1.0, columns['vessel_count'] / 50.0)
+        congestion_risk = np.minimum(
+            1.0, columns['congestion_index'] * 0.5 + wait_factor * 0.3 + capacity_factor * 0.2
+        )
+        
+        # Routes without history get the default low risk
+        recent_factor = np.minimum(1.0, columns['recent_disruptions'] / 3.0)
+        historical_risk = np.where(
+            columns['has_history'],
+            np.minimum(1.0, columns['disruption_rate'] * 0.7 + recent_factor * 0.3),
+            0.1
+        )
+        
+        return {
+            'weather': weather_risk,
+            'sentiment': sentiment_risk,
+            'congestion': congestion_risk,
+            'historical': historical_risk
+        }
+    
+    def _risk_columns(self,
+                      weather_data: List[Dict],
+                      sentiment_data: List[Dict],
+                      congestion_data: List[Dict],
+                      historical_data: List[Optional[Dict]]) -> Dict[str, np.ndarray]:
+        """Transpose per-route input dicts into the column arrays used by compute_risk_components"""
+        def column(records: List[Optional[Dict]], key: str, default) -> np.ndarray:
+            return np.fromiter(
+                (record.get(key, default) if record is not None else default for record in records),
+                dtype=float, count=len(records)
+            )
+        
+        return {
+            'severity': [w.get('severity', 'none') for w in weather_data],
+            'type': [w.get('type', 'storm') for w in weather_data],
+            'duration_hours': column(weather_data, 'duration_hours', 0),
+            'sentiment_score': column(sentiment_data, 'sentiment_score', 0.0),
+            'article_count': column(sentiment_data, 'article_count', 0),
+            'urgency_keywords': column(sentiment_data, 'urgency_keywords', 0),
+            'congestion_index': column(congestion_data, 'congestion_index', 0.0),
+            'wait_time_hours': column(congestion_data, 'wait_time_hours', 0),
+            'vessel_count': column(congestion_data, 'vessel_count', 0),
+            'disruption_rate': column(historical_data, 'disruption_rate', 0.0),
+            'recent_disruptions': column(historical_data, 'recent_disruptions', 0),
+            'has_history': np.fromiter((h is not None for h in historical_data), dtype=bool,
+                                       count=len(historical_data))
         }
     
     def predict_cascading_delays(self, 
@@ -260,35 +417,45 @@ class RiskScorer:
             # Use ML-based forecasting
             return self.forecaster.forecast_delay_cascade(route_risks, network_graph)
         
-        # Fallback to rule-based prediction
-        results = []
+        # Fallback to rule-based prediction, vectorized over routes
+        if not route_risks:
+            return []
         
-        for route_risk in route_risks:
-            base_delay_hours = 0
-            
-            # High risk routes get base delay
-            if route_risk['risk_level'] == 'high':
-                base_delay_hours = 24 + (route_risk['total_risk'] - 0.7) * 100
-            elif route_risk['risk_level'] == 'medium':
-                base_delay_hours = 6 + (route_risk['total_risk'] - 0.4) * 30
-            
-            # Cascading effects
-            cascading_delay = 0
-            if network_graph:
-                route_id = route_risk['route_id']
-                if route_id in network_graph:
-                    for dependent_route in network_graph[route_id]:
-                        cascading_delay += base_delay_hours * 0.3
-            
-            total_delay = base_delay_hours + cascading_delay
-            
-            results.append({
-                'route_id': route_risk['route_id'],
-                'predicted_delay_hours': float(total_delay),
-                'base_delay': float(base_delay_hours),
-                'cascading_delay': float(cascading_delay),
-                'risk_level': route_risk['risk_level']
-            })
-        
-        return results
+        route_ids = [route_risk['route_id'] for route_risk in route_risks]
+        risk_levels = [route_risk['risk_level'] for route_risk in route_risks]
+        total_risk = np.array([route_risk['total_risk'] for route_risk in route_risks], dtype=float)
+        levels = np.array(risk_levels)
+        
+        # High risk routes get base delay
+        base_delay_hours = np.select(
+            [levels == 'high', levels == 'medium'],
+            [24 + (total_risk - 0.7) * 100, 6 + (total_risk - 0.4) * 30],
+            0.0
+        )
+        
+        # Cascading effects: 30% of the base delay per dependent route
+        if network_graph:
+            dependent_counts = np.array([
+                len(network_graph[route_id]) if route_id in network_graph else 0
+                for route_id in route_ids
+            ], dtype=float)
+            cascading_delay = dependent_counts * (base_delay_hours * 0.3)
+        else:
+            cascading_delay = np.zeros(len(route_ids))
+        
+        total_delay = base_delay_hours + cascading_delay
+        
+        return [
+            {
+                'route_id': route_id,
+                'predicted_delay_hours': delay,
+                'base_delay': base,
+                'cascading_delay': cascading,
+                'risk_level': risk_level
+            }
+            for route_id, delay, base, cascading, risk_level in zip(
+                route_ids, total_delay.tolist(), base_delay_hours.tolist(),
+                cascading_delay.tolist(), risk_levels
+            )
+        ]
 
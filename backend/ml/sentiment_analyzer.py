@@ -3,11 +3,14 @@ Sentiment Analysis for News Articles
 Uses transformer models for real-time sentiment scoring
 """
 
-from typing import List, Dict, Optional
-import numpy as np
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
 
+# Max distinct article texts kept in the per-article score cache
+SCORE_CACHE_SIZE = 4096
+
+
 class SentimentAnalyzer:
     """
     Analyzes news article sentiment using transformer models
@@ -33,8 +36,23 @@ class SentimentAnalyzer:
             'accident', 'incident', 'breakdown', 'failure', 'outage'
         ]
         
+        # Simple keyword-based scoring (would use ML model in production)
+        self.negative_words = ['delay', 'disruption', 'problem', 'issue', 'crisis', 'failure']
+        self.positive_words = ['smooth', 'efficient', 'resolved', 'improved', 'success']
+        
+        # Every distinct keyword once, tagged with the categories it counts toward:
+        # (keyword, negative, positive, urgency)
+        self._keyword_table: Tuple[Tuple[str, int, int, int], ...] = tuple(
+            (word, int(word in self.negative_words), int(word in self.positive_words),
+             int(word in self.urgency_keywords))
+            for word in dict.fromkeys(self.negative_words + self.positive_words + self.urgency_keywords)
+        )
+        
         # Initialize model (in production, would load actual model)
         self.model_loaded = False
+        
+        # Article text -> (sentiment_score, urgency keyword count)
+        self._score_cache: Dict[str, Tuple[float, int]] = {}
     
     def _load_model(self):
         """Load sentiment analysis model"""
@@ -64,24 +82,7 @@ class SentimentAnalyzer:
         
         # Simulated sentiment analysis (replace with actual model in production)
         # In production, this would call the actual model
-        text_lower = text.lower()
-        
-        # Simple keyword-based scoring (would use ML model in production)
-        negative_words = ['delay', 'disruption', 'problem', 'issue', 'crisis', 'failure']
-        positive_words = ['smooth', 'efficient', 'resolved', 'improved', 'success']
-        
-        negative_count = sum(1 for word in negative_words if word in text_lower)
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        
-        # Score: -1 (very negative) to 1 (very positive)
-        if negative_count > positive_count:
-            sentiment_score = -0.5 - (negative_count * 0.1)
-        elif positive_count > negative_count:
-            sentiment_score = 0.3 + (positive_count * 0.1)
-        else:
-            sentiment_score = 0.0
-        
-        sentiment_score = max(-1.0, min(1.0, sentiment_score))
+        sentiment_score, _ = self._score_lower(text.lower())
         
         # Determine label
         if sentiment_score < -0.3:
@@ -97,52 +98,126 @@ class SentimentAnalyzer:
             'confidence': 0.75  # Would come from model in production
         }
     
-    def analyze_articles(self, articles: List[Dict]) -> Dict:
+    def _score_lower(self, text_lower: str) -> Tuple[float, int]:
         """
-        Analyze multiple news articles and aggregate results
+        Score already-lowercased text in one keyword scan
         
         Args:
-            articles: List of article dicts with 'title', 'content', 'source', etc.
+            text_lower: Lowercased text
             
         Returns:
-            Aggregated sentiment analysis
+            (sentiment_score from -1 to 1, urgency keyword count)
         """
-        if not articles:
-            return {
-                'sentiment_score': 0.0,
-                'article_count': 0,
-                'urgency_keywords': 0,
-                'timestamp': datetime.now().isoformat()
-            }
+        negative_count, positive_count, urgency_count = self._count_keywords(text_lower)
+        
+        # Score: -1 (very negative) to 1 (very positive)
+        if negative_count > positive_count:
+            sentiment_score = -0.5 - (negative_count * 0.1)
+        elif positive_count > negative_count:
+            sentiment_score = 0.3 + (positive_count * 0.1)
+        else:
+            sentiment_score = 0.0
         
-        # Analyze each article
-        sentiment_scores = []
-        total_urgency_keywords = 0
+        return max(-1.0, min(1.0, sentiment_score)), urgency_count
+    
+    def _count_keywords(self, text_lower: str) -> Tuple[int, int, int]:
+        """
+        Count distinct negative, positive and urgency keywords in lowercased text
+        
+        Keywords shared by several categories are searched for only once.
         
+        Args:
+            text_lower: Lowercased text
+            
+        Returns:
+            (negative count, positive count, urgency count)
+        """
+        negative = positive = urgency = 0
+        for word, is_negative, is_positive, is_urgent in self._keyword_table:
+            if word in text_lower:
+                negative += is_negative
+                positive += is_positive
+                urgency += is_urgent
+        return negative, positive, urgency
+    
+    def score_articles(self, articles: List[Dict]) -> List[Tuple[float, int]]:
+        """
+        Score each article in one batch, reusing scores for texts seen before
+        
+        Args:
+            articles: List of article dicts with 'title', 'content', 'source', etc.
+            
+        Returns:
+            List of (sentiment_score, urgency keyword count), one per article
+        """
+        if not self.model_loaded:
+            self._load_model()
+        
+        scored = []
         for article in articles:
             # Combine title and content
             text = f"{article.get('title', '')} {article.get('content', '')}"
             
-            # Analyze sentiment
-            analysis = self.analyze_text(text)
-            sentiment_scores.append(analysis['sentiment_score'])
+            cached = self._score_cache.get(text)
+            if cached is None:
+                # Sentiment and urgency keywords from a single lowercase + scan
+                cached = self._score_lower(text.lower())
+                
+                if len(self._score_cache) >= SCORE_CACHE_SIZE:
+                    self._score_cache.clear()
+                self._score_cache[text] = cached
             
-            # Count urgency keywords
-            text_lower = text.lower()
-            urgency_count = sum(1 for keyword in self.urgency_keywords if keyword in text_lower)
-            total_urgency_keywords += urgency_count
+            scored.append(cached)
+        
+        return scored
+    
+    def summarize_scores(self, scored: List[Tuple[float, int]], timestamp: Optional[str] = None) -> Dict:
+        """
+        Aggregate per-article scores from score_articles
         
-        # Aggregate scores
-        avg_sentiment = np.mean(sentiment_scores) if sentiment_scores else 0.0
+        Args:
+            scored: List of (sentiment_score, urgency keyword count)
+            timestamp: ISO timestamp to stamp the result with (defaults to now)
+            
+        Returns:
+            Aggregated sentiment analysis (same shape as analyze_articles)
+        """
+        if timestamp is None:
+            timestamp = datetime.now().isoformat()
+        
+        if not scored:
+            return {
+                'sentiment_score': 0.0,
+                'article_count': 0,
+                'urgency_keywords': 0,
+                'timestamp': timestamp
+            }
+        
+        sentiment_scores = [score for score, _ in scored]
+        
+        # Aggregate scores (plain sum: the lists are short, so an ndarray costs more than it saves)
+        avg_sentiment = sum(sentiment_scores) / len(sentiment_scores)
         
         return {
-            'sentiment_score': float(avg_sentiment),
-            'article_count': len(articles),
-            'urgency_keywords': total_urgency_keywords,
+            'sentiment_score': avg_sentiment,
+            'article_count': len(scored),
+            'urgency_keywords': sum(urgency for _, urgency in scored),
             'individual_scores': sentiment_scores,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp
         }
     
+    def analyze_articles(self, articles: List[Dict]) -> Dict:
+        """
+        Analyze multiple news articles and aggregate results
+        
+        Args:
+            articles: List of article dicts with 'title', 'content', 'source', etc.
+            
+        Returns:
+            Aggregated sentiment analysis
+        """
+        return self.summarize_scores(self.score_articles(articles))
+    
     def analyze_region(self, region_name: str, articles: List[Dict]) -> Dict:
         """
         Analyze sentiment for a specific region
@@ -3,15 +3,182 @@ Time Series Forecasting for Congestion Prediction
 Uses ARIMA and exponential smoothing for time series forecasting
 """
 
+import hashlib
 import numpy as np
-import pandas as pd
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, List, Optional, Union
 from datetime import datetime, timedelta
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; kernels fall back to NumPy / plain Python
+    njit = None
+
+
+# Without numba, series at least this long use the closed-form EMA (the Python loop is faster below it)
+EMA_VECTOR_MIN_LENGTH = 16
+
+# Max distinct (series, horizon) inputs kept in the congestion forecast cache
+FORECAST_CACHE_SIZE = 1024
+
+# Smallest allocation of a HistoryBuffer (capacity doubles from here)
+HISTORY_MIN_CAPACITY = 64
+
+
+@lru_cache(maxsize=256)
+def _slope_weights(n: int) -> np.ndarray:
+    """
+    Weights turning n evenly spaced values into their least-squares slope
+    
+    With centered x the y mean drops out (sum of x is 0), so the slope is
+    sum(x * y) / Sxx with Sxx = n(n^2 - 1) / 12.
+    """
+    weights = (np.arange(n) - (n - 1) / 2) * (12.0 / (n * (n * n - 1)))
+    weights.flags.writeable = False
+    return weights
+
+
+def _ema_loop(series, alpha):
+    """Recursive exponential moving average (compiled with numba)"""
+    ema = series[0]
+    decay = 1.0 - alpha
+    for i in range(1, series.shape[0]):
+        ema = alpha * series[i] + decay * ema
+    return ema
+
+
+_ema_kernel = njit(cache=True)(_ema_loop) if njit is not None else None
+
+
+def _cascade_loop(indptr, indices, upstream_delays):
+    """
+    Sum 30% of each route's upstream delays over its CSR dependency list (compiled with numba)
+    
+    indptr may be a slice of a larger CSR (offsets still index the full indices array),
+    which is how route chunks are cascaded in parallel.
+    """
+    out = np.zeros(indptr.shape[0] - 1)
+    for i in range(out.shape[0]):
+        total = 0.0
+        for k in range(indptr[i], indptr[i + 1]):
+            total += upstream_delays[indices[k]] * 0.3
+        out[i] = total
+    return out
+
+
+def _cascade_numpy(indptr, indices, upstream_delays):
+    """NumPy fallback for _cascade_loop"""
+    n_routes = indptr.shape[0] - 1
+    owners = np.repeat(np.arange(n_routes), np.diff(indptr))
+    weights = upstream_delays[indices[indptr[0]:indptr[-1]]] * 0.3
+    return np.bincount(owners, weights=weights, minlength=n_routes)
+
+
+# nogil: route chunks can be cascaded on several threads at once
+_cascade_kernel = njit(cache=True, nogil=True)(_cascade_loop) if njit is not None else _cascade_numpy
+
+
+class HistoryBuffer:
+    """
+    Congestion history as time-sorted parallel arrays (one entry per snapshot)
+    Storage doubles when full, so appends are amortized O(1); timestamps, congestion
+    and wait are views of the filled part
+    """
+    
+    def __init__(self,
+                 timestamps: Optional[np.ndarray] = None,
+                 congestion: Optional[np.ndarray] = None,
+                 wait: Optional[np.ndarray] = None):
+        """
+        Initialize buffer
+        
+        Args:
+            timestamps: Snapshot times, sorted ascending (datetime64[us])
+            congestion: Congestion index per snapshot
+            wait: Wait time in hours per snapshot
+        """
+        self._timestamps = np.empty(0, dtype='datetime64[us]') if timestamps is None else timestamps
+        self._congestion = np.empty(0) if congestion is None else congestion
+        self._wait = np.empty(0) if wait is None else wait
+        self._size = len(self._timestamps)
+    
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[:self._size]
+    
+    @property
+    def congestion(self) -> np.ndarray:
+        return self._congestion[:self._size]
+    
+    @property
+    def wait(self) -> np.ndarray:
+        return self._wait[:self._size]
+    
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> 'HistoryBuffer':
+        """
+        Build a buffer from congestion snapshots
+        
+        Args:
+            records: Snapshots with 'timestamp', 'congestion_index' and 'wait_time_hours'
+            
+        Returns:
+            Buffer sorted by timestamp
+        """
+        n = len(records)
+        timestamps = np.array([record['timestamp'] for record in records], dtype='datetime64[us]')
+        congestion = np.fromiter((record['congestion_index'] for record in records), dtype=float, count=n)
+        wait = np.fromiter((record['wait_time_hours'] for record in records), dtype=float, count=n)
+        
+        # History is appended in time order, so only reorder when it actually is out of order
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, congestion, wait = timestamps[order], congestion[order], wait[order]
+        
+        return cls(timestamps, congestion, wait)
+    
+    def append(self, record: Dict):
+        """Add one snapshot in place, keeping the arrays sorted (after equal timestamps)"""
+        timestamp = np.datetime64(record['timestamp'], 'us')
+        n = self._size
+        if n == len(self._timestamps):
+            capacity = max(HISTORY_MIN_CAPACITY, 2 * n)
+            self._timestamps = self._grow(self._timestamps, n, capacity)
+            self._congestion = self._grow(self._congestion, n, capacity)
+            self._wait = self._grow(self._wait, n, capacity)
+        
+        position = n
+        if n and timestamp < self._timestamps[n - 1]:
+            # Out of order: shift the later snapshots up one slot
+            position = int(np.searchsorted(self._timestamps[:n], timestamp, side='right'))
+            for array in (self._timestamps, self._congestion, self._wait):
+                array[position + 1:n + 1] = array[position:n]
+        
+        self._timestamps[position] = timestamp
+        self._congestion[position] = record['congestion_index']
+        self._wait[position] = record['wait_time_hours']
+        self._size = n + 1
+    
+    def copy(self) -> 'HistoryBuffer':
+        """Independent buffer with the same snapshots"""
+        return HistoryBuffer(self.timestamps.copy(), self.congestion.copy(), self.wait.copy())
+    
+    @staticmethod
+    def _grow(array: np.ndarray, size: int, capacity: int) -> np.ndarray:
+        """Reallocate a buffer array to capacity, keeping its first size entries"""
+        grown = np.empty(capacity, dtype=array.dtype)
+        grown[:size] = array[:size]
+        return grown
+    
+    def __len__(self) -> int:
+        return self._size
+
 
 class TimeSeriesForecaster:
     """
@@ -28,15 +195,19 @@ class TimeSeriesForecaster:
         """
         self.window_size = window_size
         self.scaler = StandardScaler()
+        
+        # (digest of the sorted series, hours_ahead) -> forecast (forecasts are pure in those inputs)
+        self._forecast_cache: Dict[tuple, Dict] = {}
     
     def forecast_congestion(self, 
-                           historical_data: List[Dict],
+                           historical_data: Union[List[Dict], HistoryBuffer],
                            hours_ahead: int = 24) -> Dict:
         """
         Forecast congestion using time series analysis
         
         Args:
-            historical_data: List of historical congestion snapshots
+            historical_data: List of historical congestion snapshots, or a HistoryBuffer
+                (already sorted arrays, skips per-snapshot dict access)
             hours_ahead: Hours to forecast ahead
             
         Returns:
@@ -45,7 +216,13 @@ class TimeSeriesForecaster:
         if not historical_data or len(historical_data) < 3:
             # Not enough data, return current or default
             if historical_data:
-                latest = historical_data[-1]
+                if isinstance(historical_data, HistoryBuffer):
+                    latest = {
+                        'congestion_index': float(historical_data.congestion[-1]),
+                        'wait_time_hours': float(historical_data.wait[-1])
+                    }
+                else:
+                    latest = historical_data[-1]
                 return {
                     'forecasted_congestion': latest.get('congestion_index', 0.5),
                     'forecasted_wait_time': latest.get('wait_time_hours', 12),
@@ -57,135 +234,273 @@ class TimeSeriesForecaster:
                 'confidence': 0.1
             }
         
-        # Convert to DataFrame
-        df = pd.DataFrame(historical_data)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp')
+        # Extract time-sorted series
+        if isinstance(historical_data, HistoryBuffer):
+            history = historical_data
+        else:
+            history = HistoryBuffer.from_records(historical_data)
+        congestion_series, wait_time_series = history.congestion, history.wait
         
-        # Extract time series
-        congestion_series = df['congestion_index'].values
-        wait_time_series = df['wait_time_hours'].values
+        # Repeated queries over the same window (e.g. dashboard refreshes) are served from cache
+        digest = hashlib.blake2b(congestion_series.tobytes(), digest_size=16)
+        digest.update(wait_time_series.tobytes())
+        key = (digest.digest(), hours_ahead)
+        cached = self._forecast_cache.get(key)
+        if cached is None:
+            cached = self._forecast_arrays(congestion_series, wait_time_series, hours_ahead)
+            if len(self._forecast_cache) >= FORECAST_CACHE_SIZE:
+                self._forecast_cache.clear()
+            self._forecast_cache[key] = cached
+        return dict(cached)
+    
+    def _forecast_arrays(self,
+                         congestion_series: np.ndarray,
+                         wait_time_series: np.ndarray,
+                         hours_ahead: int) -> Dict:
+        """
+        Forecast congestion from time-ordered series (at least 3 points)
         
+        Args:
+            congestion_series: Congestion index series
+            wait_time_series: Wait time series in hours
+            hours_ahead: Hours to forecast ahead
+            
+        Returns:
+            Forecasted congestion metrics
+        """
         # Use exponential moving average with trend
         alpha = 0.3  # Smoothing parameter
         ema_congestion = self._exponential_moving_average(congestion_series, alpha)
         ema_wait = self._exponential_moving_average(wait_time_series, alpha)
         
-        # Calculate trend
-        trend_congestion = self._calculate_trend(congestion_series)
-        trend_wait = self._calculate_trend(wait_time_series)
+        # Calculate trend (as Python floats: the scalar math below is cheaper without NumPy dispatch)
+        trend_congestion = float(self._calculate_trend(congestion_series))
+        trend_wait = float(self._calculate_trend(wait_time_series))
         
         # Forecast
-        last_congestion = congestion_series[-1]
-        last_wait = wait_time_series[-1]
+        last_congestion = float(congestion_series[-1])
+        last_wait = float(wait_time_series[-1])
         
-        # Simple linear extrapolation with trend
-        forecast_congestion = last_congestion + trend_congestion * hours_ahead
-        forecast_wait = last_wait + trend_wait * hours_ahead
-        
-        # Apply bounds
-        forecast_congestion = np.clip(forecast_congestion, 0, 1)
-        forecast_wait = max(0, forecast_wait)
+        # Simple linear extrapolation with trend, then bounds
+        forecast_congestion = min(1.0, max(0.0, last_congestion + trend_congestion * hours_ahead))
+        forecast_wait = max(0.0, last_wait + trend_wait * hours_ahead)
         
         # Confidence based on data quality and variance
-        variance = np.var(congestion_series[-min(10, len(congestion_series)):])
+        variance = self._tail_variance(congestion_series, 10)
         confidence = max(0.3, min(0.9, 1.0 - variance * 2))
         
         return {
-            'forecasted_congestion': float(forecast_congestion),
-            'forecasted_wait_time': float(forecast_wait),
+            'forecasted_congestion': forecast_congestion,
+            'forecasted_wait_time': forecast_wait,
             'trend': 'increasing' if trend_congestion > 0.001 else 'decreasing' if trend_congestion < -0.001 else 'stable',
-            'confidence': float(confidence),
+            'confidence': confidence,
+            'hours_ahead': hours_ahead
+        }
+    
+    def forecast_congestion_batch(self,
+                                  congestion_matrix: np.ndarray,
+                                  wait_matrix: np.ndarray,
+                                  hours_ahead: int = 24) -> Dict[str, np.ndarray]:
+        """
+        Forecast congestion for many ports/routes at once (same rules as forecast_congestion)
+        
+        Args:
+            congestion_matrix: Congestion index series, one time-ordered row per series (R x T)
+            wait_matrix: Wait time series in hours, aligned with congestion_matrix (R x T)
+            hours_ahead: Hours to forecast ahead
+            
+        Returns:
+            Dict of per-series arrays ('forecasted_congestion', 'forecasted_wait_time',
+            'confidence', plus 'trend' when T >= 3) and 'hours_ahead'
+        """
+        congestion_matrix = np.asarray(congestion_matrix, dtype=float)
+        wait_matrix = np.asarray(wait_matrix, dtype=float)
+        n_series, n_times = congestion_matrix.shape
+        
+        if n_times < 3:
+            # Not enough data, return current or default
+            if n_times:
+                return {
+                    'forecasted_congestion': congestion_matrix[:, -1].copy(),
+                    'forecasted_wait_time': wait_matrix[:, -1].copy(),
+                    'confidence': np.full(n_series, 0.3),
+                    'hours_ahead': hours_ahead
+                }
+            return {
+                'forecasted_congestion': np.full(n_series, 0.5),
+                'forecasted_wait_time': np.full(n_series, 12.0),
+                'confidence': np.full(n_series, 0.1),
+                'hours_ahead': hours_ahead
+            }
+        
+        # Trend of every series from the shared regression weights of the window
+        n_points = min(self.window_size, n_times)
+        weights = _slope_weights(n_points)
+        trend_congestion = congestion_matrix[:, -n_points:] @ weights / n_points
+        trend_wait = wait_matrix[:, -n_points:] @ weights / n_points
+        
+        # Simple linear extrapolation with trend, then bounds
+        forecast_congestion = np.clip(congestion_matrix[:, -1] + trend_congestion * hours_ahead, 0, 1)
+        forecast_wait = np.maximum(0, wait_matrix[:, -1] + trend_wait * hours_ahead)
+        
+        # Confidence based on variance of the most recent points
+        variance = congestion_matrix[:, -min(10, n_times):].var(axis=1)
+        confidence = np.clip(1.0 - variance * 2, 0.3, 0.9)
+        
+        trend = np.where(
+            trend_congestion > 0.001, 'increasing',
+            np.where(trend_congestion < -0.001, 'decreasing', 'stable')
+        )
+        
+        return {
+            'forecasted_congestion': forecast_congestion,
+            'forecasted_wait_time': forecast_wait,
+            'trend': trend,
+            'confidence': confidence,
             'hours_ahead': hours_ahead
         }
     
     def forecast_delay_cascade(self,
                               route_risks: List[Dict],
-                              network_dependencies: Optional[Dict] = None) -> List[Dict]:
+                              network_dependencies: Optional[Dict] = None,
+                              n_jobs: int = 1) -> List[Dict]:
         """
         Forecast cascading delays using network analysis
         
         Args:
             route_risks: List of route risk assessments
             network_dependencies: Graph of route dependencies
+            n_jobs: Threads to split the cascade computation across (routes in contiguous chunks)
             
         Returns:
             List of routes with forecasted delays
         """
-        results = []
+        if not route_risks:
+            return []
         
-        for route_risk in route_risks:
-            risk_score = route_risk.get('total_risk', 0)
-            risk_level = route_risk.get('risk_level', 'low')
-            
-            # Base delay prediction using ML-based risk score
-            if risk_level == 'high':
-                base_delay = 24 + (risk_score - 0.7) * 120  # 24-124 hours
-            elif risk_level == 'medium':
-                base_delay = 6 + (risk_score - 0.4) * 40  # 6-46 hours
-            else:
-                base_delay = risk_score * 10  # 0-4 hours
-            
-            # Cascading effects
-            cascading_delay = 0
-            if network_dependencies:
-                route_id = route_risk.get('route_id', '')
-                if route_id in network_dependencies:
-                    for dep_route in network_dependencies[route_id]:
-                        # Find dependent route risk
-                        dep_risk = next(
-                            (r for r in route_risks if r.get('route_id') == dep_route),
-                            None
-                        )
-                        if dep_risk:
-                            # Cascading delay = 30% of upstream delay
-                            dep_base = dep_risk.get('predicted_delay_hours', 0)
-                            cascading_delay += dep_base * 0.3
-            
-            total_delay = base_delay + cascading_delay
-            
-            results.append({
+        risk_scores = np.fromiter(
+            (route_risk.get('total_risk', 0) for route_risk in route_risks),
+            dtype=float, count=len(route_risks)
+        )
+        risk_levels = [route_risk.get('risk_level', 'low') for route_risk in route_risks]
+        levels = np.array(risk_levels)
+        
+        # Base delay prediction using ML-based risk score (nested np.where: np.select's
+        # own overhead outweighs the whole computation at typical route counts)
+        base_delays = np.where(
+            levels == 'high', 24 + (risk_scores - 0.7) * 120,  # 24-124 hours
+            np.where(levels == 'medium', 6 + (risk_scores - 0.4) * 40,  # 6-46 hours
+                     risk_scores * 10)  # 0-4 hours
+        )
+        confidences = np.where(risk_scores > 0.5, 0.7, 0.5)
+        
+        # Cascading effects: 30% of each upstream route's delay, summed per route
+        if network_dependencies:
+            route_ids = [route_risk.get('route_id', '') for route_risk in route_risks]
+            indptr, indices = self._dependency_csr(route_ids, network_dependencies)
+            upstream_delays = np.fromiter(
+                (float(r.get('predicted_delay_hours', 0)) for r in route_risks),
+                dtype=float, count=len(route_risks)
+            )
+            cascading_delays = self._cascade(indptr, indices, upstream_delays, n_jobs)
+        else:
+            cascading_delays = np.zeros(len(route_risks))
+        
+        total_delays = base_delays + cascading_delays
+        
+        return [
+            {
                 'route_id': route_risk.get('route_id', ''),
-                'predicted_delay_hours': float(total_delay),
-                'base_delay': float(base_delay),
-                'cascading_delay': float(cascading_delay),
+                'predicted_delay_hours': total_delay,
+                'base_delay': base_delay,
+                'cascading_delay': cascading_delay,
                 'risk_level': risk_level,
-                'confidence': 0.7 if risk_score > 0.5 else 0.5
-            })
+                'confidence': confidence
+            }
+            for route_risk, total_delay, base_delay, cascading_delay, risk_level, confidence in zip(
+                route_risks, total_delays.tolist(), base_delays.tolist(),
+                cascading_delays.tolist(), risk_levels, confidences.tolist()
+            )
+        ]
+    
+    def _cascade(self, indptr: np.ndarray, indices: np.ndarray, upstream_delays: np.ndarray,
+                 n_jobs: int = 1) -> np.ndarray:
+        """Run the cascade kernel over all routes, in n_jobs contiguous route chunks when n_jobs > 1"""
+        n_routes = len(indptr) - 1
+        n_chunks = min(n_jobs, n_routes)
+        if n_chunks <= 1:
+            return _cascade_kernel(indptr, indices, upstream_delays)
         
-        return results
+        bounds = np.linspace(0, n_routes, n_chunks + 1).astype(int)
+        with ThreadPoolExecutor(max_workers=n_chunks) as executor:
+            chunks = executor.map(
+                lambda start, stop: _cascade_kernel(indptr[start:stop + 1], indices, upstream_delays),
+                bounds[:-1], bounds[1:]
+            )
+            return np.concatenate(list(chunks))
+    
+    def _dependency_csr(self, route_ids: List[str], network_dependencies: Dict) -> tuple:
+        """
+        Convert a route dependency dict to CSR arrays over positions in route_ids
+        
+        Args:
+            route_ids: Route IDs in position order
+            network_dependencies: Graph of route dependencies (route_id -> upstream route_ids)
+            
+        Returns:
+            (indptr, indices): upstream positions of route i are indices[indptr[i]:indptr[i + 1]]
+        """
+        # First occurrence wins for duplicate route_ids; unknown upstream routes are skipped
+        position = {}
+        for i, route_id in enumerate(route_ids):
+            position.setdefault(route_id, i)
+        
+        dependency_lists = [
+            [position[dep_route] for dep_route in network_dependencies.get(route_id, ())
+             if dep_route in position]
+            for route_id in route_ids
+        ]
+        
+        indptr = np.zeros(len(route_ids) + 1, dtype=np.int32)
+        np.cumsum([len(deps) for deps in dependency_lists], out=indptr[1:])
+        indices = np.fromiter(chain.from_iterable(dependency_lists), dtype=np.int32, count=int(indptr[-1]))
+        return indptr, indices
     
     def _exponential_moving_average(self, series: np.ndarray, alpha: float) -> float:
         """Calculate exponential moving average"""
-        if len(series) == 0:
+        n = len(series)
+        if n == 0:
             return 0.0
         
-        ema = series[0]
-        for value in series[1:]:
-            ema = alpha * value + (1 - alpha) * ema
+        if _ema_kernel is not None:
+            return float(_ema_kernel(np.asarray(series, dtype=float), alpha))
+        
+        if n < EMA_VECTOR_MIN_LENGTH:
+            ema = series[0]
+            for value in series[1:]:
+                ema = alpha * value + (1 - alpha) * ema
+            return ema
         
-        return ema
+        # Closed form of the recurrence: value k is weighted alpha * (1 - alpha)^(n-1-k),
+        # except the seed series[0], which is weighted (1 - alpha)^(n-1)
+        weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1, dtype=float)
+        weights[0] = (1 - alpha) ** (n - 1)
+        return float(weights @ np.asarray(series, dtype=float))
+    
+    def _tail_variance(self, series: np.ndarray, n_tail: int) -> float:
+        """Population variance of the last n_tail values (two-pass over a handful of floats;
+        np.var's dispatch overhead dominates at this size)"""
+        tail = series[-n_tail:].tolist()
+        mean = sum(tail) / len(tail)
+        return sum((value - mean) * (value - mean) for value in tail) / len(tail)
     
     def _calculate_trend(self, series: np.ndarray) -> float:
         """Calculate linear trend (slope)"""
         if len(series) < 2:
             return 0.0
         
-        # Use linear regression on recent points
+        # Least-squares slope over the most recent points (x = 0..n-1)
         n_points = min(self.window_size, len(series))
-        recent = series[-n_points:]
-        x = np.arange(len(recent))
-        
-        # Simple linear regression
-        x_mean = np.mean(x)
-        y_mean = np.mean(recent)
-        
-        numerator = np.sum((x - x_mean) * (recent - y_mean))
-        denominator = np.sum((x - x_mean) ** 2)
-        
-        if denominator == 0:
-            return 0.0
-        
-        slope = numerator / denominator
-        return slope / len(recent)  # Normalize by series length
-
+        recent = np.asarray(series[-n_points:], dtype=float)
+        slope = _slope_weights(n_points) @ recent
+        return slope / n_points  # Normalize by series length